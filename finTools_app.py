@@ -239,6 +239,7 @@ def main():
     sidebar_inputs = render_sidebar()
 
     file_path = sidebar_inputs["file_path"]
+    file_hash = sidebar_inputs["file_hash"]
     extract_portfolio = sidebar_inputs["extract_portfolio"]
     save_csv = sidebar_inputs["save_csv"]
     process_button = sidebar_inputs["process_button"]
@@ -296,7 +297,8 @@ def main():
         file_type_display = "WebArchive" if file_type == 'webarchive' else "MHTML"
 
         with st.spinner(f"Processing {file_type_display} file..."):
-            result = process_file(
+            result = process_file_cached(
+                file_hash=file_hash,
                 file_path=file_path,
                 extract_portfolio=extract_portfolio,
                 save_csv=save_csv
@@ -341,7 +343,13 @@ def main():
         if df is None and result.get("holdings"):
             # Handle both dict (consolidated) and list formats
             holdings_data = result["holdings"]
-            if isinstance(holdings_data, dict) and 'holdings' in holdings_data:
+            if (file_type in ('webarchive', 'mhtml')
+                    and result.get("content_type", "portfolio") == "portfolio"):
+                # Text extractors keep numbers as strings; this gives the CSV
+                # columns with numeric Value so the sort below is by amount.
+                # Other content types (net worth accounts) keep their own columns
+                df = holdings_to_dataframe_mht(holdings_data)
+            elif isinstance(holdings_data, dict) and 'holdings' in holdings_data:
                 df = pd.DataFrame(holdings_data['holdings'])
             else:
                 df = pd.DataFrame(result["holdings"])
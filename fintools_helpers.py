@@ -16,10 +16,10 @@ import uuid
 import time
 import datetime
 import traceback
+import hashlib
 from urllib.parse import quote_plus, unquote_plus
 import urllib.request
 import urllib.error
-import yfinance as yf
 
 # Add this import at the top of the file with the other imports
 import plotly.express as px
@@ -49,10 +49,12 @@ from read_empower_mhtml import (
     save_holdings_to_csv as save_holdings_to_csv_mht,
     format_holdings_as_text as format_holdings_as_text_mht,
     save_networth_to_csv as save_networth_to_csv_mht,
-    format_networth_as_text as format_networth_as_text_mht
+    format_networth_as_text as format_networth_as_text_mht,
+    holdings_to_dataframe as holdings_to_dataframe_mht
 )
 
-from llm_helpers import send_query_to_llm
+# llm_helpers (openai/anthropic) and yfinance are imported lazily where used so
+# that Streamlit reruns which never reach those paths don't pay their import cost
 
 # Add JSON import for processing JSON files
 import json
@@ -1401,13 +1403,28 @@ def render_sidebar():
         st.header("Step 1: Upload File")
 
         file_path = None
+        file_hash = None
         uploaded_file = st.file_uploader("Upload a file", type=["webarchive", "mhtml", "mht", "json"])
         if uploaded_file:
             # Save the uploaded file to user-specific directory
             user_dir = ensure_user_files_dir()
             temp_file_path = os.path.join(user_dir, uploaded_file.name)
-            with open(temp_file_path, "wb") as f:
-                f.write(uploaded_file.getvalue())
+            upload_id = getattr(uploaded_file, "file_id", None)
+            cached_info = st.session_state.get("uploaded_file_info")
+            if upload_id and cached_info and cached_info[0] == upload_id and cached_info[2] == temp_file_path:
+                # Same upload as the previous rerun: the file is already on disk
+                file_hash = cached_info[1]
+            else:
+                # Stream to disk in 1 MiB chunks, hashing as we go, so the whole
+                # upload is never materialized as a second bytes object
+                hasher = hashlib.blake2b(digest_size=16)
+                uploaded_file.seek(0)
+                with open(temp_file_path, "wb") as f:
+                    for chunk in iter(lambda: uploaded_file.read(1 << 20), b""):
+                        hasher.update(chunk)
+                        f.write(chunk)
+                file_hash = hasher.hexdigest()
+                st.session_state.uploaded_file_info = (upload_id, file_hash, temp_file_path)
             file_path = temp_file_path
 
         # Process button
@@ -1418,6 +1435,7 @@ def render_sidebar():
     # Always set extract_portfolio and save_csv to True
     return {
         "file_path": file_path,
+        "file_hash": file_hash,
         "file_selection_method": "Upload a file",  # Always upload now
         "extract_portfolio": True,  # Always extract portfolio
         "save_csv": True,           # Always save CSV
@@ -1620,13 +1638,15 @@ def process_file(file_path, extract_portfolio=True, save_csv=True):
         user_dir = ensure_user_files_dir()
         text_path = os.path.join(user_dir, f"{output_file_base}.txt")
         with open(text_path, "w", encoding="utf-8") as file:
-            file.write(f"Transactions Export\n")
-            file.write(f"Period: {holdings_data['start_date']} to {holdings_data['end_date']}\n")
-            file.write(f"Interval: {holdings_data['interval_type']}\n\n")
-            file.write(f"Money In:     ${holdings_data['money_in']:,.2f}\n")
-            file.write(f"Money Out:    ${holdings_data['money_out']:,.2f}\n")
-            file.write(f"Net Cashflow: ${holdings_data['net_cashflow']:,.2f}\n\n")
-            file.write(f"Total Transactions: {holdings_data['count']}\n")
+            file.write(
+                f"Transactions Export\n"
+                f"Period: {holdings_data['start_date']} to {holdings_data['end_date']}\n"
+                f"Interval: {holdings_data['interval_type']}\n\n"
+                f"Money In:     ${holdings_data['money_in']:,.2f}\n"
+                f"Money Out:    ${holdings_data['money_out']:,.2f}\n"
+                f"Net Cashflow: ${holdings_data['net_cashflow']:,.2f}\n\n"
+                f"Total Transactions: {holdings_data['count']}\n"
+            )
 
     elif content_type == 'accounts':
         # Process accounts snapshot data (JSON only)
@@ -1738,6 +1758,29 @@ def process_file(file_path, extract_portfolio=True, save_csv=True):
         "content_type": content_type
     }
 
+# Output files of process_file that a cached result points at
+_PROCESS_OUTPUT_KEYS = ("csv_path", "raw_data_path", "text_path", "morningstar_path", "report_path")
+
+@st.cache_data(max_entries=32, ttl=3600, show_spinner=False)
+def _process_file_cached(file_hash, file_path, extract_portfolio, save_csv):
+    """process_file result without the extracted page text, which the app never reads."""
+    result = process_file(file_path, extract_portfolio=extract_portfolio, save_csv=save_csv)
+    return {key: value for key, value in result.items() if key != "text"}
+
+def process_file_cached(file_hash, file_path, extract_portfolio=True, save_csv=True):
+    """Cached wrapper around process_file keyed on the uploaded file's content hash.
+
+    Re-clicking Process with an identical upload returns the stored result
+    instead of re-running the whole extraction pipeline and rewriting outputs.
+    The cache is bounded, and a hit whose output files have since been deleted
+    (e.g. by cleanup_old_sessions) is processed again.
+    """
+    result = _process_file_cached(file_hash, file_path, extract_portfolio, save_csv)
+    if any(result.get(key) and not os.path.exists(result[key]) for key in _PROCESS_OUTPUT_KEYS):
+        _process_file_cached.clear()
+        result = _process_file_cached(file_hash, file_path, extract_portfolio, save_csv)
+    return result
+
 def read_csv_to_dataframe(csv_path):
     """Read a CSV file and return a pandas DataFrame"""
     try:
@@ -1771,6 +1814,7 @@ def fetch_performance_metrics(symbols):
     if not sym_list:
         return metrics
 
+    import yfinance as yf
     today = _dt.date.today()
 
     def _ann_return(series, years):
@@ -1853,6 +1897,7 @@ def fetch_realtime_quotes(symbols):
     if not unique_symbols:
         return quote_data
 
+    import yfinance as yf
     try:
         # Batch download last 2 days so we always have a previous-close for change calculation
         raw = yf.download(
@@ -2295,6 +2340,270 @@ def render_performance_report_dashboard(report_file):
     )
 
 
+@st.cache_data(show_spinner=False)
+def build_metrics_grid_html(metrics, columns=2):
+    """Render (label, value, help) tuples as one HTML grid styled like st.metric."""
+    import html as _html
+
+    cells = []
+    for label, value, help_text in metrics:
+        title = f' title="{_html.escape(help_text)}"' if help_text else ""
+        cells.append(
+            f'<div{title} style="padding:4px 0 12px 0;">'
+            f'<div style="font-size:0.875rem;opacity:0.7;">{_html.escape(label)}</div>'
+            f'<div style="font-size:1.75rem;line-height:1.3;">{_html.escape(str(value))}</div>'
+            f'</div>'
+        )
+    return (
+        f'<div style="display:grid;grid-template-columns:repeat({columns}, 1fr);column-gap:1rem;">'
+        + "".join(cells)
+        + "</div>"
+    )
+
+
+def _chart_values(values):
+    """Return holding values as float32 for the chart-only numeric passes.
+
+    Dollar totals stay float64; float32 is used only where ~7 significant
+    digits are plenty (quartiles, binning, Lorenz curve) and the values fit.
+    """
+    arr = np.asarray(values, dtype=np.float64)
+    if arr.size and np.abs(arr).max() < np.finfo(np.float32).max:
+        return arr.astype(np.float32)
+    return arr
+
+
+@st.cache_data(show_spinner=False)
+def compute_value_bounds(values):
+    """Return (q1, q3, upper_bound) used to trim outliers from the value histogram."""
+    # One quantile call partitions the buffer once for both quartiles
+    q1, q3 = np.quantile(_chart_values(values), [0.25, 0.75])
+    iqr = q3 - q1
+    return q1, q3, q3 + 2.5 * iqr
+
+
+@st.cache_data(show_spinner=False)
+def build_holdings_treemap(display_data):
+    """Build the holdings treemap figure (as a plotly dict) for the top holdings + Other."""
+    fig_treemap = px.treemap(
+        display_data,
+        path=['Symbol'],
+        values='pct_of_total',
+        color='Value_numeric',
+        color_continuous_scale='Viridis',
+        hover_data=['Name', 'Value_numeric'],
+        title='Portfolio Holdings Treemap'
+    )
+    fig_treemap.update_layout(height=600, margin=dict(t=50, l=25, r=25, b=25))
+    return fig_treemap.to_dict()
+
+
+@st.cache_data(show_spinner=False)
+def build_top10_bar(holdings_pct):
+    """Build the horizontal top-10 holdings bar chart (as a plotly dict)."""
+    # holdings_pct is already sorted descending; reverse the head for the
+    # bottom-to-top bar order instead of copying and re-sorting it
+    top10_data = holdings_pct.iloc[:10][::-1]
+    fig_bar = go.Figure(go.Bar(
+        x=top10_data['pct_of_total'],
+        y=top10_data['Label'],
+        orientation='h',
+        marker=dict(color=top10_data['pct_of_total'], colorscale='Viridis'),
+        text=top10_data['Value_numeric'].map('${:,.2f}'.format).to_list(),
+        textposition='auto'
+    ))
+    fig_bar.update_layout(
+        title='Top 10 Holdings by Portfolio Percentage',
+        xaxis_title='Percentage of Portfolio',
+        yaxis_title='Holdings',
+        height=500,
+        margin=dict(l=250, r=50)
+    )
+    return fig_bar.to_dict()
+
+
+@st.cache_data(show_spinner=False)
+def build_value_histogram(values, upper_bound):
+    """Build the holding-value histogram (as a plotly dict), excluding values above upper_bound."""
+    chart_values = _chart_values(values)
+    filtered_values = chart_values[chart_values <= upper_bound]
+    # Bin on the Python side so the figure carries 20 bars, not every holding value
+    counts, edges = np.histogram(filtered_values, bins=20)
+    centers = 0.5 * (edges[:-1] + edges[1:])
+    fig_hist = go.Figure(go.Bar(
+        x=centers,
+        y=counts,
+        width=np.diff(edges),
+        marker_color='lightblue',
+    ))
+    fig_hist.update_layout(
+        title='Distribution of Holding Values',
+        xaxis_title='Holding Value ($)',
+        yaxis_title='Number of Holdings',
+        showlegend=False,
+        height=500
+    )
+    return fig_hist.to_dict()
+
+
+# Upper bound on points sent to the browser for the Lorenz curve trace
+_LORENZ_MAX_POINTS = 1000
+# Below these holding counts the visualizations / Lorenz-Gini view are skipped
+_MIN_HOLDINGS_FOR_CHARTS = 3
+_LORENZ_MIN_HOLDINGS = 5
+
+# Gini concentration bands: [0, 0.2) Very Low, [0.2, 0.4) Low, ... [0.8, 1] Very High
+_GINI_CUTS = np.array([0.2, 0.4, 0.6, 0.8])
+_GINI_LABELS = np.array(['Very Low', 'Low', 'Moderate', 'High', 'Very High'])
+
+
+@st.cache_data(show_spinner=False)
+def build_lorenz_curve(holdings_pct, total_value):
+    """Build the Lorenz curve figure (as a plotly dict) and the portfolio Gini coefficient.
+
+    Gini is None when there are too few holdings for it to be meaningful.
+    """
+    # Sort and accumulate once; both the curve and the Gini reuse these arrays
+    values = np.sort(_chart_values(holdings_pct['Value_numeric']))
+    n = values.size
+    ranks = np.arange(1, n + 1)
+    # Single cumsum allocation, scaled to percent in place
+    cumulative_pct = np.cumsum(values, dtype=np.float64)
+    total = cumulative_pct[-1] if n else 0.0
+    cumulative_pct *= 100.0 / total_value
+    holding_pct = ranks * (100.0 / max(n, 1))
+
+    # The curve is monotone and smooth, so very large portfolios are resampled
+    # to a fixed number of points before being shipped to the browser
+    curve_x, curve_y = holding_pct, cumulative_pct
+    if n > _LORENZ_MAX_POINTS:
+        curve_x = np.linspace(holding_pct[0], 100, _LORENZ_MAX_POINTS)
+        curve_y = np.interp(curve_x, holding_pct, cumulative_pct)
+
+    fig_lorenz = go.Figure()
+    fig_lorenz.add_trace(go.Scatter(x=[0, 100], y=[0, 100], mode='lines', name='Perfect Equality', line=dict(color='black', dash='dash')))
+    fig_lorenz.add_trace(go.Scattergl(
+        x=curve_x,
+        y=curve_y,
+        mode='lines',
+        name='Portfolio Distribution',
+        fill='tozeroy',
+        line=dict(color='blue')
+    ))
+    fig_lorenz.update_layout(
+        title='Portfolio Concentration Analysis (Lorenz Curve)',
+        xaxis_title='Cumulative % of Holdings',
+        yaxis_title='Cumulative % of Portfolio Value',
+        height=500
+    )
+
+    gini = None
+    if n > _LORENZ_MIN_HOLDINGS:
+        # Closed form of 1 - 2 * (trapezoidal area under the Lorenz curve)
+        gini = (2 * np.dot(ranks, values) - (n + 1) * total) / (n * total) if total else 0.0
+    return fig_lorenz.to_dict(), gini
+
+
+@st.cache_data(show_spinner=False)
+def build_asset_allocation_charts(asset_data):
+    """Build the asset-allocation pie and bar charts (as plotly dicts) and the summary table.
+
+    Both asset-allocation sections of the analysis share this single cached build.
+    """
+    fig_asset = px.pie(
+        asset_data,
+        values='pct_of_total',
+        names='Category',
+        title='Asset Allocation by Category',
+        hover_data=['Value_numeric'],
+        labels={'Value_numeric': 'Value ($)'},
+        color_discrete_sequence=px.colors.qualitative.Bold
+    )
+    fig_asset.update_traces(textposition='inside', textinfo='percent+label')
+    fig_asset.update_layout(uniformtext_minsize=12, uniformtext_mode='hide')
+    fig_asset_bar = px.bar(
+        asset_data,
+        x='Category',
+        y='pct_of_total',
+        title='Asset Allocation by Category',
+        text_auto=True,
+        labels={'pct_of_total': 'Percentage of Portfolio', 'Category': 'Asset Category'},
+        color='Category',
+        color_discrete_sequence=px.colors.qualitative.Bold
+    )
+    asset_table = asset_data[['Category', 'pct_of_total']].rename(
+        columns={'pct_of_total': '% of Portfolio'}
+    ).reset_index(drop=True)
+    return fig_asset.to_dict(), fig_asset_bar.to_dict(), asset_table
+
+
+@st.fragment
+def _render_treemap_tab(display_data):
+    """Holdings treemap tab; a fragment so its reruns don't re-execute the other tabs."""
+    st.plotly_chart(build_holdings_treemap(display_data), width='stretch')
+    st.caption("Treemap visualization shows each holding sized by percentage of portfolio with color intensity based on value.")
+
+
+@st.fragment
+def _render_top10_tab(holdings_pct):
+    """Top-10 holdings bar chart tab."""
+    st.plotly_chart(build_top10_bar(holdings_pct), width='stretch')
+
+
+@st.fragment
+def _render_distribution_tab(values, upper_bound, stats):
+    """Holding-value histogram tab; upper_bound is computed once by the caller."""
+    st.plotly_chart(build_value_histogram(values, upper_bound), width='stretch')
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Mean Value", f"${stats['avg_value']:,.2f}")
+    c2.metric("Median Value", f"${stats['median_value']:,.2f}")
+    c3.metric("Standard Deviation", f"${stats['std_dev']:,.2f}")
+    if upper_bound < stats['max_value']:
+        st.info(f"Note: Some holdings with values greater than ${upper_bound:,.2f} were excluded from the histogram for better visualization.")
+
+
+@st.fragment
+def _render_concentration_tab(holdings_pct, total_value):
+    """Lorenz curve and Gini coefficient tab."""
+    if len(holdings_pct) <= _LORENZ_MIN_HOLDINGS:
+        st.info(f"The concentration analysis needs more than {_LORENZ_MIN_HOLDINGS} holdings.")
+        return
+
+    fig_lorenz, gini = build_lorenz_curve(holdings_pct, total_value)
+    st.plotly_chart(fig_lorenz, width='stretch')
+    st.caption("""
+    **Interpreting the Lorenz Curve:**
+    - The diagonal line represents perfect equality (all holdings have equal value)
+    - The curve shows actual distribution of your portfolio
+    - The greater the distance between the curve and diagonal, the more concentrated your portfolio
+    - A concentrated portfolio may have higher risk due to lack of diversification
+    """)
+
+    if gini is not None:
+        st.metric("Portfolio Gini Coefficient", f"{gini:.2f}", help="Measures inequality in your portfolio. Values range from 0 (perfect equality) to 1 (perfect inequality).")
+        concentration = str(_GINI_LABELS[np.searchsorted(_GINI_CUTS, gini, side='right')])
+        st.info(f"Your portfolio has a **{concentration}** concentration level based on the Gini coefficient.")
+        st.markdown("""
+        ### 📘 Understanding Gini vs HHI
+
+        **Gini Coefficient**
+        - Measures overall *inequality* in your portfolio.
+        - Sensitive to **all holdings**, including small ones.
+        - A high Gini (close to 1) means a few holdings make up most of the portfolio, with many very small ones.
+
+        **HHI (Herfindahl-Hirschman Index)**
+        - Measures *concentration* using squared percentage weights.
+        - Focuses more on **large holdings**.
+        - A low HHI means no single holding dominates—even if many others are small.
+
+        🧠 **Why they can differ:**
+        You might have a few large holdings and many tiny ones.
+        Gini will say "high inequality", while HHI might still say "low concentration".
+
+        Both are useful — Gini shows diversification risk; HHI shows exposure to dominant assets.
+        """)
+
+
 def render_portfolio_analysis(df, is_realtime=False, raw_holdings_list=None):
     """Render the full portfolio analysis (table, statistics, charts) for a given holdings DataFrame."""
     btn_key_suffix = "_rt" if is_realtime else ""
@@ -2397,6 +2706,7 @@ def render_portfolio_analysis(df, is_realtime=False, raw_holdings_list=None):
     stats = calculate_portfolio_statistics(df, raw_holdings_list=raw_holdings_list)
     if st.button("Ask AI for Portfolio Insights", key=f"llm_review_btn{btn_key_suffix}"):
         with st.spinner("AI is reviewing your portfolio..."):
+            from llm_helpers import send_query_to_llm
             llm_prompt = (
                 "You are a financial portfolio expert. "
                 "Review the following portfolio holdings and statistics. "
@@ -2416,9 +2726,8 @@ def render_portfolio_analysis(df, is_realtime=False, raw_holdings_list=None):
             st.success("AI Portfolio Review:")
             st.write(llm_response)
 
-    # Portfolio statistics section
+    # Portfolio statistics section (reuses the stats computed for the AI review above)
     st.header("Portfolio Statistics")
-    stats = calculate_portfolio_statistics(df, raw_holdings_list=raw_holdings_list)
 
     if 'error' in stats:
         st.error(stats['error'])
@@ -2430,40 +2739,32 @@ def render_portfolio_analysis(df, is_realtime=False, raw_holdings_list=None):
         col1, col2 = st.columns(2)
 
         with col1:
+            # Each block is a single HTML grid (row-major, two columns) rather
+            # than one st.metric widget per value
             st.subheader("Summary Statistics")
-            metrics_col1, metrics_col2 = st.columns(2)
-
-            with metrics_col1:
-                st.metric(label="Total Value", value=f"${stats['total_value']:,.2f}")
-                st.metric(label="Holdings Count", value=stats['count'])
-                st.metric(label="Cash %", value=f"{stats.get('cash_pct', 0.0):.1f}%", help="Percentage of portfolio held as cash")
-
-            with metrics_col2:
-                st.metric(label="Largest Holding", value=f"${stats['max_value']:,.2f}")
-                st.metric(label="Total Cash", value=f"${stats.get('total_cash', 0.0):,.2f}")
-                st.metric(label="Top Holding %", value=f"{stats.get('top_holding_pct', 0.0):.1f}%", help="Percentage of portfolio in the single largest holding")
+            st.markdown(build_metrics_grid_html((
+                ("Total Value", f"${stats['total_value']:,.2f}", None),
+                ("Largest Holding", f"${stats['max_value']:,.2f}", None),
+                ("Holdings Count", stats['count'], None),
+                ("Total Cash", f"${stats.get('total_cash', 0.0):,.2f}", None),
+                ("Cash %", f"{stats.get('cash_pct', 0.0):.1f}%", "Percentage of portfolio held as cash"),
+                ("Top Holding %", f"{stats.get('top_holding_pct', 0.0):.1f}%", "Percentage of portfolio in the single largest holding"),
+            )), unsafe_allow_html=True)
 
             st.subheader("Portfolio Concentration")
-            metrics_col3, metrics_col4 = st.columns(2)
-
-            with metrics_col3:
-                st.metric(label="Top 5 Holdings", value=f"{stats['top_5_pct']:.2f}%")
-                st.metric(label="HHI Score", value=f"{stats['hhi']:.2f}")
-
-            with metrics_col4:
-                st.metric(label="Top 10 Holdings", value=f"{stats['top_10_pct']:.2f}%")
-                st.metric(label="Concentration", value=stats['concentration'])
+            st.markdown(build_metrics_grid_html((
+                ("Top 5 Holdings", f"{stats['top_5_pct']:.2f}%", None),
+                ("Top 10 Holdings", f"{stats['top_10_pct']:.2f}%", None),
+                ("HHI Score", f"{stats['hhi']:.2f}", None),
+                ("Concentration", stats['concentration'], None),
+            )), unsafe_allow_html=True)
 
         if 'asset_allocation' in stats and not stats['asset_allocation'].empty:
             with st.expander("Asset Allocation", expanded=True):
                 asset_data = stats['asset_allocation']
+                _, _, asset_table = build_asset_allocation_charts(asset_data)
                 st.bar_chart(asset_data.set_index('Category')['pct_of_total'])
-                st.dataframe(
-                    asset_data[['Category', 'pct_of_total']].rename(
-                        columns={'pct_of_total': '% of Portfolio'}
-                    ).reset_index(drop=True),
-                    hide_index=True
-                )
+                st.dataframe(asset_table, hide_index=True)
 
         if 'tax_allocation' in stats and not stats['tax_allocation'].empty:
             _TAX_COLOURS = {
@@ -2486,7 +2787,7 @@ def render_portfolio_analysis(df, is_realtime=False, raw_holdings_list=None):
                     )
                     _fig_tax.update_traces(textposition="inside", textinfo="percent+label")
                     _fig_tax.update_layout(height=320, margin=dict(t=40, l=10, r=10, b=10), showlegend=False)
-                    st.plotly_chart(_fig_tax, width="stretch")
+                    st.plotly_chart(_fig_tax.to_dict(), width="stretch")
                 with _pie_cols[1]:
                     st.dataframe(
                         _ta.assign(Value=_ta["Value"].map("${:,.2f}".format),
@@ -2509,19 +2810,7 @@ def render_portfolio_analysis(df, is_realtime=False, raw_holdings_list=None):
 
         with col2:
             st.subheader("Top Holdings")
-            top_data = stats['holdings_pct'].head(10)
-            others_sum = stats['holdings_pct'].iloc[10:]['pct_of_total'].sum() if len(stats['holdings_pct']) > 10 else 0
-
-            if others_sum > 0:
-                others_row = pd.DataFrame({
-                    'Symbol': ['OTHER'],
-                    'Name': ['Other Holdings'],
-                    'Value_numeric': [others_sum / 100 * stats['total_value']],
-                    'pct_of_total': [others_sum]
-                })
-                display_data = pd.concat([top_data, others_row])
-            else:
-                display_data = top_data
+            display_data = stats['display_holdings']
 
             st.dataframe(
                 display_data[['Name', 'Symbol', 'pct_of_total']].rename(
@@ -2531,159 +2820,34 @@ def render_portfolio_analysis(df, is_realtime=False, raw_holdings_list=None):
                 height=420
             )
 
-        st.header("Portfolio Visualizations")
-        tabs = st.tabs(["Holdings Treemap", "Top 10 Bar Chart", "Value Distribution", "Portfolio Concentration"])
-
-        with tabs[0]:
-            treemap_data = display_data.copy()
-            fig_treemap = px.treemap(
-                treemap_data,
-                path=['Symbol'],
-                values='pct_of_total',
-                color='Value_numeric',
-                color_continuous_scale='Viridis',
-                hover_data=['Name', 'Value_numeric'],
-                title='Portfolio Holdings Treemap'
-            )
-            fig_treemap.update_layout(height=600, margin=dict(t=50, l=25, r=25, b=25))
-            st.plotly_chart(fig_treemap, width='stretch')
-            st.caption("Treemap visualization shows each holding sized by percentage of portfolio with color intensity based on value.")
-
-        with tabs[1]:
-            top10_data = stats['holdings_pct'].head(10).copy()
-            top10_data = top10_data.sort_values('pct_of_total')
-            fig_bar = go.Figure(go.Bar(
-                x=top10_data['pct_of_total'],
-                y=top10_data['Name'] + " (" + top10_data['Symbol'] + ")",
-                orientation='h',
-                marker=dict(color=top10_data['pct_of_total'], colorscale='Viridis'),
-                text=[f"${v:,.2f}" for v in top10_data['Value_numeric']],
-                textposition='auto'
-            ))
-            fig_bar.update_layout(
-                title='Top 10 Holdings by Portfolio Percentage',
-                xaxis_title='Percentage of Portfolio',
-                yaxis_title='Holdings',
-                height=500,
-                margin=dict(l=250, r=50)
-            )
-            st.plotly_chart(fig_bar, width='stretch')
-
-        with tabs[2]:
-            q1 = np.percentile(df['Value_numeric'], 25)
-            q3 = np.percentile(df['Value_numeric'], 75)
-            iqr = q3 - q1
-            upper_bound = q3 + 2.5 * iqr
-            filtered_values = df[df['Value_numeric'] <= upper_bound]['Value_numeric']
-            fig_hist = px.histogram(
-                filtered_values,
-                nbins=20,
-                title='Distribution of Holding Values',
-                labels={'value': 'Holding Value ($)', 'count': 'Number of Holdings'},
-                color_discrete_sequence=['lightblue'],
-            )
-            fig_hist.update_layout(showlegend=False, height=500)
-            st.plotly_chart(fig_hist, width='stretch')
-            c1, c2, c3 = st.columns(3)
-            c1.metric("Mean Value", f"${stats['avg_value']:,.2f}")
-            c2.metric("Median Value", f"${stats['median_value']:,.2f}")
-            c3.metric("Standard Deviation", f"${stats['std_dev']:,.2f}")
-            if upper_bound < stats['max_value']:
-                st.info(f"Note: Some holdings with values greater than ${upper_bound:,.2f} were excluded from the histogram for better visualization.")
-
-        with tabs[3]:
-            lorenz_data = stats['holdings_pct'].copy().sort_values('Value_numeric')
-            lorenz_data['cumulative_pct'] = lorenz_data['Value_numeric'].cumsum() / stats['total_value'] * 100
-            lorenz_data['holding_pct'] = 100 * (np.arange(1, len(lorenz_data) + 1) / len(lorenz_data))
-
-            fig_lorenz = go.Figure()
-            fig_lorenz.add_trace(go.Scatter(x=[0, 100], y=[0, 100], mode='lines', name='Perfect Equality', line=dict(color='black', dash='dash')))
-            fig_lorenz.add_trace(go.Scatter(
-                x=lorenz_data['holding_pct'].tolist(),
-                y=lorenz_data['cumulative_pct'].tolist(),
-                mode='lines',
-                name='Portfolio Distribution',
-                fill='tozeroy',
-                line=dict(color='blue')
-            ))
-            fig_lorenz.update_layout(
-                title='Portfolio Concentration Analysis (Lorenz Curve)',
-                xaxis_title='Cumulative % of Holdings',
-                yaxis_title='Cumulative % of Portfolio Value',
-                height=500
-            )
-            st.plotly_chart(fig_lorenz, width='stretch')
-            st.caption("""
-            **Interpreting the Lorenz Curve:**
-            - The diagonal line represents perfect equality (all holdings have equal value)
-            - The curve shows actual distribution of your portfolio
-            - The greater the distance between the curve and diagonal, the more concentrated your portfolio
-            - A concentrated portfolio may have higher risk due to lack of diversification
-            """)
-
-            if len(lorenz_data) > 5:
-                x = lorenz_data['holding_pct'].values / 100
-                y = lorenz_data['cumulative_pct'].values / 100
-                x = np.insert(x, 0, 0)
-                y = np.insert(y, 0, 0)
-                B = np.trapezoid(y, x)
-                gini = 1 - 2 * B
-                st.metric("Portfolio Gini Coefficient", f"{gini:.2f}", help="Measures inequality in your portfolio. Values range from 0 (perfect equality) to 1 (perfect inequality).")
-                if gini < 0.2:
-                    concentration = "Very Low"
-                elif gini < 0.4:
-                    concentration = "Low"
-                elif gini < 0.6:
-                    concentration = "Moderate"
-                elif gini < 0.8:
-                    concentration = "High"
-                else:
-                    concentration = "Very High"
-                st.info(f"Your portfolio has a **{concentration}** concentration level based on the Gini coefficient.")
-                st.markdown("""
-                ### 📘 Understanding Gini vs HHI
+        # Treemap, distribution and Lorenz views say nothing useful about a
+        # portfolio of one or two positions, so skip building them entirely
+        if stats['count'] < _MIN_HOLDINGS_FOR_CHARTS:
+            st.caption("Portfolio visualizations are shown for portfolios with at least "
+                       f"{_MIN_HOLDINGS_FOR_CHARTS} holdings.")
+        else:
+            st.header("Portfolio Visualizations")
+            tabs = st.tabs(["Holdings Treemap", "Top 10 Bar Chart", "Value Distribution", "Portfolio Concentration"])
 
-                **Gini Coefficient**
-                - Measures overall *inequality* in your portfolio.
-                - Sensitive to **all holdings**, including small ones.
-                - A high Gini (close to 1) means a few holdings make up most of the portfolio, with many very small ones.
+            # Value bounds are computed (and cached) outside the distribution
+            # fragment so a fragment rerun doesn't redo the percentile pass
+            _, _, upper_bound = compute_value_bounds(df['Value_numeric'])
 
-                **HHI (Herfindahl-Hirschman Index)**
-                - Measures *concentration* using squared percentage weights.
-                - Focuses more on **large holdings**.
-                - A low HHI means no single holding dominates—even if many others are small.
+            with tabs[0]:
+                _render_treemap_tab(display_data)
 
-                🧠 **Why they can differ:**
-                You might have a few large holdings and many tiny ones.
-                Gini will say "high inequality", while HHI might still say "low concentration".
+            with tabs[1]:
+                _render_top10_tab(stats['holdings_pct'])
 
-                Both are useful — Gini shows diversification risk; HHI shows exposure to dominant assets.
-                """)
+            with tabs[2]:
+                _render_distribution_tab(df['Value_numeric'], upper_bound, stats)
+
+            with tabs[3]:
+                _render_concentration_tab(stats['holdings_pct'], stats['total_value'])
 
         if 'asset_allocation' in stats and not stats['asset_allocation'].empty:
             st.header("Asset Allocation")
-            asset_data = stats['asset_allocation']
-            fig_asset = px.pie(
-                asset_data,
-                values='pct_of_total',
-                names='Category',
-                title='Asset Allocation by Category',
-                hover_data=['Value_numeric'],
-                labels={'Value_numeric': 'Value ($)'},
-                color_discrete_sequence=px.colors.qualitative.Bold
-            )
-            fig_asset.update_traces(textposition='inside', textinfo='percent+label')
-            fig_asset.update_layout(uniformtext_minsize=12, uniformtext_mode='hide')
-            fig_asset_bar = px.bar(
-                asset_data,
-                x='Category',
-                y='pct_of_total',
-                title='Asset Allocation by Category',
-                text_auto=True,
-                labels={'pct_of_total': 'Percentage of Portfolio', 'Category': 'Asset Category'},
-                color='Category',
-                color_discrete_sequence=px.colors.qualitative.Bold
-            )
+            fig_asset, fig_asset_bar, _ = build_asset_allocation_charts(stats['asset_allocation'])
             asset_col1, asset_col2 = st.columns(2)
             with asset_col1:
                 st.plotly_chart(fig_asset, width='stretch')
@@ -2777,10 +2941,14 @@ def calculate_portfolio_statistics(df, raw_holdings_list=None):
             stats['std_dev'] = df['Value_numeric'].std()
             stats['value_range'] = stats['max_value'] - stats['min_value']
 
-            # Calculate concentration metrics
-            df_sorted = df.sort_values('Value_numeric', ascending=False)
-            stats['top_5_pct'] = df_sorted.head(5)['Value_numeric'].sum() / stats['total_value'] * 100 if stats['count'] >= 5 else 100
-            stats['top_10_pct'] = df_sorted.head(10)['Value_numeric'].sum() / stats['total_value'] * 100 if stats['count'] >= 10 else 100
+            # Calculate concentration metrics. Only the top 10 positions are
+            # needed, so select them with an O(N) partition and sort just those
+            values = df['Value_numeric'].to_numpy(dtype=float)
+            k = min(10, len(values))
+            top_idx = np.argpartition(-values, k - 1)[:k] if k else np.array([], dtype=int)
+            top_idx = top_idx[np.argsort(-values[top_idx], kind='stable')]
+            stats['top_5_pct'] = values[top_idx[:5]].sum() / stats['total_value'] * 100 if stats['count'] >= 5 else 100
+            stats['top_10_pct'] = values[top_idx].sum() / stats['total_value'] * 100 if stats['count'] >= 10 else 100
 
             # Calculate Herfindahl-Hirschman Index (HHI) - measure of concentration
             # HHI is the sum of squared percentages (0-10000 scale)
@@ -2809,33 +2977,60 @@ def calculate_portfolio_statistics(df, raw_holdings_list=None):
                 stats['error'] = f"Missing required columns: {', '.join(missing_columns)}"
                 return stats
 
-            # Create a copy with standardized column names for easier processing
-            df_mapped = df.copy()
+            # Calculate top holdings (top 10 instead of top 5), exposing the
+            # symbol column under the standard 'Symbol' name
+            top_holdings = df.iloc[top_idx]
             if _sym_col != 'Symbol':
-                df_mapped['Symbol'] = df[_sym_col]
-
-            # Calculate top holdings (top 10 instead of top 5)
-            top_holdings = df_mapped.sort_values(by='Value_numeric', ascending=False).head(10)
+                top_holdings = top_holdings.assign(Symbol=top_holdings[_sym_col])
             stats['top_holdings'] = top_holdings
 
             # Calculate percentage of total for each holding
-            df_mapped['pct_of_total'] = df_mapped['Value_numeric'] / stats['total_value'] * 100
+            pct_of_total = df['Value_numeric'] / stats['total_value'] * 100
 
             # Asset type classification if 'Category' column exists
-            if 'Category' in df_mapped.columns:
-                category_stats = df_mapped.groupby('Category')['Value_numeric'].sum().reset_index()
+            if 'Category' in df.columns:
+                category_stats = df.groupby('Category')['Value_numeric'].sum().reset_index()
                 category_stats['pct_of_total'] = category_stats['Value_numeric'] / stats['total_value'] * 100
                 stats['asset_allocation'] = category_stats.sort_values('pct_of_total', ascending=False)
-                _cash_mask = df_mapped['Category'].str.strip().str.lower() == 'cash'
-                stats['total_cash'] = df_mapped.loc[_cash_mask, 'Value_numeric'].sum()
-            elif 'Type' in df_mapped.columns:
-                _cash_mask = df_mapped['Type'].str.strip().str.lower() == 'cash'
-                stats['total_cash'] = df_mapped.loc[_cash_mask, 'Value_numeric'].sum()
-
-            # Use the mapped column names for the final dataframe
-            cols_to_select = ['Name', 'Symbol', 'Value_numeric', 'pct_of_total']  # Swapped Name and Symbol order
-            stats['holdings_pct'] = df_mapped[cols_to_select].sort_values(by='pct_of_total', ascending=False)
+                _cash_mask = df['Category'].str.strip().str.lower() == 'cash'
+                stats['total_cash'] = df.loc[_cash_mask, 'Value_numeric'].sum()
+            elif 'Type' in df.columns:
+                _cash_mask = df['Type'].str.strip().str.lower() == 'cash'
+                stats['total_cash'] = df.loc[_cash_mask, 'Value_numeric'].sum()
+
+            # Build the small per-holding frame from column views rather than
+            # copying the full holdings DataFrame just to alias one column.
+            # 'Label' ("Name (Symbol)") is built once here for the chart views.
+            # Consumers only read the top 10 in rank order (the Lorenz curve
+            # sorts its own values), so reuse the partitioned top_idx instead
+            # of fully sorting: top 10 descending first, the rest in df order.
+            _rest = np.ones(len(values), dtype=bool)
+            _rest[top_idx] = False
+            _order = np.concatenate([top_idx, np.flatnonzero(_rest)])
+            _label = df['Name'].astype('string') + ' (' + df[_sym_col].astype('string') + ')'
+            stats['holdings_pct'] = pd.DataFrame({
+                'Name': df['Name'].values,
+                'Symbol': df[_sym_col].values,
+                'Value_numeric': df['Value_numeric'].values,
+                'pct_of_total': pct_of_total.values,
+                'Label': _label.values,
+            }, index=df.index).iloc[_order]
             stats['top_holding_pct'] = stats['holdings_pct'].iloc[0]['pct_of_total'] if not stats['holdings_pct'].empty else 0.0
+
+            # Top 10 holdings plus a single "Other" bucket for the rest, built
+            # once here rather than on every rerun of the summary/treemap views
+            stats['others_pct'] = pct_of_total.values[_rest].sum()
+            display_holdings = stats['holdings_pct'].head(10)
+            if stats['others_pct'] > 0:
+                display_holdings = display_holdings.copy()
+                display_holdings.loc['OTHER'] = pd.Series({
+                    'Name': 'Other Holdings',
+                    'Symbol': 'OTHER',
+                    'Value_numeric': stats['others_pct'] / 100 * stats['total_value'],
+                    'pct_of_total': stats['others_pct'],
+                    'Label': 'Other Holdings (OTHER)',
+                })
+            stats['display_holdings'] = display_holdings
             stats['cash_pct'] = stats.get('total_cash', 0.0) / stats['total_value'] * 100 if stats['total_value'] > 0 else 0.0
 
             # ── Tax-status allocation ─────────────────────────────────────────
@@ -2849,8 +3044,8 @@ def calculate_portfolio_statistics(df, raw_holdings_list=None):
                     if _val:
                         _tax_rows.append({"Account": _acct, "Value_numeric": _val,
                                           "Tax Status": classify_tax_status(_acct)})
-            elif "Account" in df_mapped.columns:
-                for _, _row in df_mapped.iterrows():
+            elif "Account" in df.columns:
+                for _, _row in df.iterrows():
                     _acct = str(_row.get("Account", "") or "")
                     _val  = pd.to_numeric(_row.get("Value_numeric", 0), errors="coerce") or 0.0
                     if _val:
@@ -3122,85 +3317,90 @@ def create_text_report(stats, df, output_file_base):
     base_name = os.path.basename(output_file_base)
     report_path = os.path.join(user_dir, f"{base_name}_report.txt")
 
+    parts = []
+    app = parts.append
+    app("PORTFOLIO ANALYSIS REPORT\n")
+    app("=" * 100 + "\n\n")
+
+    # Summary statistics
+    app("SUMMARY STATISTICS\n")
+    app("-" * 50 + "\n")
+    W = 30  # label width
+    app(f"{'Total Portfolio Value:':<{W}} ${stats['total_value']:>15,.2f}\n")
+    app(f"{'Number of Holdings:':<{W}} {stats['count']:>16}\n")
+    app(f"{'Average Holding Value:':<{W}} ${stats['avg_value']:>15,.2f}\n")
+    app(f"{'Median Holding Value:':<{W}} ${stats['median_value']:>15,.2f}\n")
+    app(f"{'Standard Deviation:':<{W}} ${stats['std_dev']:>15,.2f}\n")
+    app(f"{'Largest Holding:':<{W}} ${stats['max_value']:>15,.2f}\n")
+    app(f"{'Smallest Holding:':<{W}} ${stats['min_value']:>15,.2f}\n")
+    app(f"{'Value Range:':<{W}} ${stats['value_range']:>15,.2f}\n\n")
+
+    # Concentration metrics
+    app("CONCENTRATION METRICS\n")
+    app("-" * 50 + "\n")
+    app(f"{'Top 5 Holdings:':<{W}} {stats['top_5_pct']:>14.2f}%  of portfolio\n")
+    app(f"{'Top 10 Holdings:':<{W}} {stats['top_10_pct']:>14.2f}%  of portfolio\n")
+    app(f"{'HHI Concentration Score:':<{W}} {stats['hhi']:>14.2f}  ({stats['concentration']})\n\n")
+
+    # Asset allocation if available
+    if 'asset_allocation' in stats:
+        app("ASSET ALLOCATION\n")
+        app("-" * 60 + "\n")
+        app(f"{'Category':<30} {'Weight %':>10}   {'Value':>15}\n")
+        app("-" * 60 + "\n")
+        for idx, row in stats['asset_allocation'].iterrows():
+            cat = str(row['Category'])[:29]
+            pct = row['pct_of_total']
+            val = row['Value_numeric']
+            app(f"{cat:<30} {pct:>9.2f}%   ${val:>14,.2f}\n")
+        app("\n")
+
+    # Top holdings
+    app("TOP HOLDINGS\n")
+    app("-----------\n")
+    app(f"{'Rank':<6} {'Ticker':<10} {'Name':<35} {'Value':<15} {'Weight %':<10}\n")
+    app("-" * 78 + "\n")
+
+    top_holdings = stats['holdings_pct'].head(10)
+    for rank, (idx, row) in enumerate(top_holdings.iterrows(), 1):
+        sym = str(row.get('Symbol', ''))[:9]
+        nm  = str(row.get('Name', ''))[:34]
+        val = row.get('Value_numeric', 0)
+        pct = row.get('pct_of_total', 0)
+        app(f"{rank:<6} {sym:<10} {nm:<35} ${val:<14,.2f} {pct:.2f}%\n")
+
+    if len(stats['holdings_pct']) > 10:
+        others_sum = stats['others_pct']
+        others_value = others_sum / 100 * stats['total_value']
+        app(f"{'':6} {'(other)':<10} {'':<35} ${others_value:<14,.2f} {others_sum:.2f}%\n")
+    app("\n")
+
+    # All holdings sorted by value
+    app("\nALL HOLDINGS (by value)\n")
+    app("-" * 100 + "\n")
+    app(f"{'Ticker':<10} {'Name':<35} {'Shares':<12} {'Price':<12} {'Value':<15} {'Type':<10}\n")
+    app("-" * 100 + "\n")
+
+    for idx, row in df.sort_values('Value_numeric', ascending=False).iterrows():
+        ticker = str(row.get('Ticker', row.get('Symbol', '')))[:9]
+        name   = str(row.get('Name', ''))[:34]
+        value  = row.get('Value_numeric', row.get('Value', 0))
+        try:
+            shares = float(row.get('Shares', 0) or 0)
+            shares_str = f"{shares:.2f}"
+        except (TypeError, ValueError):
+            shares_str = str(row.get('Shares', ''))
+        try:
+            price = float(row.get('Price', 0) or 0)
+            price_str = f"${price:.2f}"
+        except (TypeError, ValueError):
+            price_str = str(row.get('Price', ''))
+        htype = str(row.get('Type', row.get('Asset Type', '')))[:9]
+        app(f"{ticker:<10} {name:<35} {shares_str:<12} {price_str:<12} ${value:<14,.2f} {htype:<10}\n")
+
+    # Emit the whole report with a single write instead of one call per line
     with open(report_path, "w", encoding="utf-8") as file:
-        file.write("PORTFOLIO ANALYSIS REPORT\n")
-        file.write("=" * 100 + "\n\n")
-
-        # Summary statistics
-        file.write("SUMMARY STATISTICS\n")
-        file.write("-" * 50 + "\n")
-        W = 30  # label width
-        file.write(f"{'Total Portfolio Value:':<{W}} ${stats['total_value']:>15,.2f}\n")
-        file.write(f"{'Number of Holdings:':<{W}} {stats['count']:>16}\n")
-        file.write(f"{'Average Holding Value:':<{W}} ${stats['avg_value']:>15,.2f}\n")
-        file.write(f"{'Median Holding Value:':<{W}} ${stats['median_value']:>15,.2f}\n")
-        file.write(f"{'Standard Deviation:':<{W}} ${stats['std_dev']:>15,.2f}\n")
-        file.write(f"{'Largest Holding:':<{W}} ${stats['max_value']:>15,.2f}\n")
-        file.write(f"{'Smallest Holding:':<{W}} ${stats['min_value']:>15,.2f}\n")
-        file.write(f"{'Value Range:':<{W}} ${stats['value_range']:>15,.2f}\n\n")
-
-        # Concentration metrics
-        file.write("CONCENTRATION METRICS\n")
-        file.write("-" * 50 + "\n")
-        file.write(f"{'Top 5 Holdings:':<{W}} {stats['top_5_pct']:>14.2f}%  of portfolio\n")
-        file.write(f"{'Top 10 Holdings:':<{W}} {stats['top_10_pct']:>14.2f}%  of portfolio\n")
-        file.write(f"{'HHI Concentration Score:':<{W}} {stats['hhi']:>14.2f}  ({stats['concentration']})\n\n")
-
-        # Asset allocation if available
-        if 'asset_allocation' in stats:
-            file.write("ASSET ALLOCATION\n")
-            file.write("-" * 60 + "\n")
-            file.write(f"{'Category':<30} {'Weight %':>10}   {'Value':>15}\n")
-            file.write("-" * 60 + "\n")
-            for idx, row in stats['asset_allocation'].iterrows():
-                cat = str(row['Category'])[:29]
-                pct = row['pct_of_total']
-                val = row['Value_numeric']
-                file.write(f"{cat:<30} {pct:>9.2f}%   ${val:>14,.2f}\n")
-            file.write("\n")
-
-        # Top holdings
-        file.write("TOP HOLDINGS\n")
-        file.write("-----------\n")
-        file.write(f"{'Rank':<6} {'Ticker':<10} {'Name':<35} {'Value':<15} {'Weight %':<10}\n")
-        file.write("-" * 78 + "\n")
-
-        top_holdings = stats['holdings_pct'].head(10)
-        for rank, (idx, row) in enumerate(top_holdings.iterrows(), 1):
-            sym = str(row.get('Symbol', ''))[:9]
-            nm  = str(row.get('Name', ''))[:34]
-            val = row.get('Value_numeric', 0)
-            pct = row.get('pct_of_total', 0)
-            file.write(f"{rank:<6} {sym:<10} {nm:<35} ${val:<14,.2f} {pct:.2f}%\n")
-
-        if len(stats['holdings_pct']) > 10:
-            others_sum = stats['holdings_pct'].iloc[10:]['pct_of_total'].sum()
-            others_value = others_sum / 100 * stats['total_value']
-            file.write(f"{'':6} {'(other)':<10} {'':<35} ${others_value:<14,.2f} {others_sum:.2f}%\n")
-        file.write("\n")
-
-        # All holdings sorted by value
-        file.write("\nALL HOLDINGS (by value)\n")
-        file.write("-" * 100 + "\n")
-        file.write(f"{'Ticker':<10} {'Name':<35} {'Shares':<12} {'Price':<12} {'Value':<15} {'Type':<10}\n")
-        file.write("-" * 100 + "\n")
-
-        for idx, row in df.sort_values('Value_numeric', ascending=False).iterrows():
-            ticker = str(row.get('Ticker', row.get('Symbol', '')))[:9]
-            name   = str(row.get('Name', ''))[:34]
-            value  = row.get('Value_numeric', row.get('Value', 0))
-            try:
-                shares = float(row.get('Shares', 0) or 0)
-                shares_str = f"{shares:.2f}"
-            except (TypeError, ValueError):
-                shares_str = str(row.get('Shares', ''))
-            try:
-                price = float(row.get('Price', 0) or 0)
-                price_str = f"${price:.2f}"
-            except (TypeError, ValueError):
-                price_str = str(row.get('Price', ''))
-            htype = str(row.get('Type', row.get('Asset Type', '')))[:9]
-            file.write(f"{ticker:<10} {name:<35} {shares_str:<12} {price_str:<12} ${value:<14,.2f} {htype:<10}\n")
+        file.write("".join(parts))
 
     return report_path
 
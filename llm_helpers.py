@@ -1,13 +1,19 @@
 import os
 import base64
+import logging
 import time
+import asyncio
+import random
+import hashlib
+import inspect
+import json
 # Replace direct dotenv import with our environment manager
 from env_manager import load_environment_variables
 import requests
 from typing import Dict, List, Union, Optional
 
-import openai
-import anthropic  # Add import for Anthropic
+# openai / anthropic are imported on first use (see _provider_sdk) so that
+# importing this module, or using only one provider, doesn't load both SDKs
 
 # Get the logger
 from log_manager import get_logger
@@ -15,19 +21,31 @@ logger = get_logger("CoachAI_LLM_helpers")
 
 # Create cache for memoization
 import diskcache  # Import the module directly
-cache = diskcache.Cache("llm_cache_folder")  # Use the module directly
+# SQLite in WAL mode lets concurrent (e.g. async batch) lookups read while a reply is written
+cache = diskcache.Cache(
+    "llm_cache_folder",
+    size_limit=10 * 2**30,
+    sqlite_journal_mode="wal",
+    sqlite_synchronous=1,  # NORMAL
+    sqlite_cache_size=8192,
+)
+_MISS = object()  # sentinel so a lookup is one cache.get instead of `in` + `[]`
 
 # OPENAI API configuration
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_API_BASE_URL = os.getenv("OPENAI_API_BASE_URL", "https://api.openai.com/v1/")
+OPENAI_MODEL_ID = os.getenv("OPENAI_MODEL_ID", "chatgpt-4o-latest")  # o1-mini gpt-4o chatgpt-4o-latest gpt-4-turbo
 
 # Anthropic API configuration
 ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
 ANTHROPIC_MODEL_ID = os.getenv("ANTHROPIC_MODEL_ID", "claude-3-5sonnet--20241022")  # "claude-3-haiku-20240229"  # "claude-3-haiku-20240229"
+# Output token budget per Anthropic reply, clamped to what older Claude models accept
+ANTHROPIC_MAX_TOKENS = min(int(os.getenv("ANTHROPIC_MAX_TOKENS", "4096")), 8192)
 
 # DeepSeek API configuration
 DS_API_KEY = os.getenv("DS_API_KEY")
 DS_API_BASE_URL = os.getenv("DS_API_BASE_URL", "https://api.deepseek.com/v1")
+DS_MODEL_ID = os.getenv("DS_MODEL_ID", "deepseek-reasoner")
 
 # local LM Studio API configuration
 LM_API_KEY = os.getenv("LM_API_KEY", "LM_STUDIO_NO_API_KEY")
@@ -46,16 +64,44 @@ OLM_MODEL_ID = os.getenv("OLM_MODEL_ID", "llama3.2")
 # Possible values 1: OpenAI, 2: Anthropic, 3: DeepSeek API, 4: local LM Studio, 5: local Ollama
 LLM_CHOICE = int(os.getenv("LLM_CHOICE", "1"))
 
+# (api_key, base_url, model_id, use_anthropic) per LLM choice, resolved once at import
+_LLM_SETTINGS = {
+    1: (OPENAI_API_KEY, OPENAI_API_BASE_URL, OPENAI_MODEL_ID, False),
+    2: (ANTHROPIC_API_KEY, None, ANTHROPIC_MODEL_ID, True),
+    3: (DS_API_KEY, DS_API_BASE_URL, DS_MODEL_ID, False),
+    4: (LM_API_KEY, LM_API_BASE_URL, LM_MODEL_ID, False),
+    5: (OLM_API_KEY, OLM_API_BASE_URL, OLM_MODEL_ID, False),
+}
+
+# Optional expiry (seconds) for cached LLM replies; unset/0 keeps them until cleared
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", "0")) or None
+
+def _cache_key(system_message, query, llm_choice=None):
+    """SHA-256 of the canonicalized request, so equivalent calls share one entry"""
+    llm_choice = llm_choice or LLM_CHOICE
+    payload = {
+        "choice": llm_choice,
+        "model": _llm_settings(llm_choice)[2],
+        "sys": system_message.strip(),
+        "q": query.strip(),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
 def memoize(func):
-    """Memoize decorator to cache function results"""
+    """Memoize decorator to cache LLM replies keyed on (system_message, query, llm_choice)"""
+    signature = inspect.signature(func)
+
     def wrapper(*args, **kwargs):
-        key = (args, tuple(sorted(kwargs.items())))
-        if key in cache:
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        key = _cache_key(**bound.arguments)
+        cached = cache.get(key, default=_MISS)
+        if cached is not _MISS:
             logger.info(f"Memoize: Cache hit for {func.__name__}")
-            return cache[key]
+            return cached
         result = func(*args, **kwargs)
-        if result is not None:  # Never cache None/failed results
-            cache[key] = result
+        if result:  # Never cache None/empty/failed results
+            cache.set(key, result, expire=LLM_CACHE_TTL)
             logger.info(f"Memoize: Cached result for {func.__name__}")
         return result
     return wrapper
@@ -71,6 +117,96 @@ def clear_llm_cache():
         logger.error(f"Error clearing cache: {e}")
         return f"Error clearing cache: {e}"
 
+def _llm_settings(llm_choice):
+    """Return (api_key, base_url, model_id, use_anthropic) for an LLM choice"""
+    try:
+        return _LLM_SETTINGS[llm_choice]
+    except KeyError:
+        raise ValueError(f"Invalid LLM choice: {llm_choice}") from None
+
+def _request_kwargs(model_id, use_anthropic, system_message, query):
+    """Build the create() arguments for the selected provider and model"""
+    if use_anthropic:
+        # Mark the system prompt cacheable and keep it out of the user turn, so
+        # repeated calls with the same system message read it from the prompt cache
+        return dict(
+            model=model_id,
+            system=[
+                {"type": "text", "text": system_message, "cache_control": {"type": "ephemeral"}}
+            ],
+            messages=[
+                {"role": "user", "content": query}
+            ],
+            max_tokens=ANTHROPIC_MAX_TOKENS
+        )
+    if model_id == "o1-mini":
+        # o1-mini model does not support role system or max_tokens
+        logger.warning(f"No support for role system or max_tokens in model {model_id}.")
+        return dict(
+            model=model_id,
+            messages=[
+                {"role": "user", "content": system_message + " " + query},
+            ],
+            max_completion_tokens=1000,
+        )
+    return dict(
+        model=model_id,
+        messages=[
+            {"role": "system", "content": system_message},
+            {"role": "user", "content": query},
+        ],
+        max_tokens=16384,
+    )
+
+def _extract_reply(response, use_anthropic):
+    """Return the reply text from a provider response"""
+    if use_anthropic:
+        return response.content[0].text
+    if response and response.choices:
+        return (getattr(response.choices[0].message, "content", "") or "").strip()
+    return None
+
+def _provider_sdk(use_anthropic):
+    """Import the provider SDK on first use; return (module, base error class)"""
+    if use_anthropic:
+        import anthropic
+        return anthropic, anthropic.APIError
+    import openai
+    return openai, openai.OpenAIError
+
+# Retry policy for LLM calls: jittered exponential backoff capped at this many seconds
+MAX_RETRY_BACKOFF = 16
+
+def _retry_delay(attempt, error=None, sdk=None):
+    """Seconds to wait before retry number `attempt` (1-based), or None if the error is not retryable"""
+    jitter = random.uniform(0.5, 1.5)
+    if error is not None and sdk is not None:
+        # Errors that will fail the same way on every attempt
+        if isinstance(error, (sdk.AuthenticationError, sdk.PermissionDeniedError, sdk.BadRequestError)):
+            return None
+        if isinstance(error, sdk.APIConnectionError):
+            return jitter  # transient network blip: retry quickly
+        if isinstance(error, sdk.RateLimitError):
+            attempt += 1  # back off harder when the provider is throttling
+    return min(jitter * 2 ** attempt, MAX_RETRY_BACKOFF)
+
+# Sync clients are created once per LLM choice and reused across calls so
+# the SDK's own HTTP connection pool (and its TLS sessions) stays warm
+_CLIENTS = {}
+
+def _get_client(llm_choice):
+    """Return (client, model_id, use_anthropic) using a shared sync client"""
+    api_key, base_url, model_id, use_anthropic = _llm_settings(llm_choice)
+    client = _CLIENTS.get(llm_choice)
+    if client is None:
+        sdk, _ = _provider_sdk(use_anthropic)
+        if use_anthropic:
+            client = sdk.Anthropic(api_key=api_key)
+        else:
+            client = sdk.OpenAI(api_key=api_key, base_url=base_url)
+        _CLIENTS[llm_choice] = client
+    return client, model_id, use_anthropic
+
 @memoize
 def send_query_to_llm(system_message, query, llm_choice = None):
     """Send a query to the selected LLM and return the response"""
@@ -78,87 +214,41 @@ def send_query_to_llm(system_message, query, llm_choice = None):
     attempt = 0
     reply = None
 
-    OPENAI_MODEL_ID = os.getenv("OPENAI_MODEL_ID", "chatgpt-4o-latest")  # o1-mini gpt-4o chatgpt-4o-latest gpt-4-turbo
-    ANTHROPIC_MODEL_ID = os.getenv("ANTHROPIC_MODEL_ID", "claude-3-5sonnet--20241022")  # "claude-3-haiku-20240229"  # "claude-3-haiku-20240229"
-    DS_MODEL_ID = os.getenv("DS_MODEL_ID", "deepseek-reasoner")
+    if not llm_choice:
+        llm_choice = LLM_CHOICE
+    sdk, sdk_error = _provider_sdk(_llm_settings(llm_choice)[3])
 
     while attempt < max_attempts:
         try:
-            if not llm_choice:
-                llm_choice = LLM_CHOICE
-
-            if llm_choice == 1:
-                client_openai = openai.OpenAI(api_key=OPENAI_API_KEY, base_url=OPENAI_API_BASE_URL)
-                model_id = OPENAI_MODEL_ID
-                use_anthropic = False
-            elif llm_choice == 2:
-                # Anthropic API setup
-                client_anthropic = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
-                model_id = ANTHROPIC_MODEL_ID
-                use_anthropic = True
-            elif llm_choice == 3:
-                client_openai = openai.OpenAI(api_key=DS_API_KEY, base_url=DS_API_BASE_URL)
-                model_id = DS_MODEL_ID
-                use_anthropic = False
-            elif llm_choice == 4:
-                client_openai = openai.OpenAI(api_key=LM_API_KEY, base_url=LM_API_BASE_URL)
-                model_id = LM_MODEL_ID
-                use_anthropic = False
-            elif llm_choice == 5:
-                client_openai = openai.OpenAI(api_key=OLM_API_KEY, base_url=OLM_API_BASE_URL)
-                model_id = OLM_MODEL_ID
-                use_anthropic = False
+            client, model_id, use_anthropic = _get_client(llm_choice)
+            if use_anthropic:
+                client_anthropic = client
             else:
-                raise ValueError(f"Invalid LLM choice: {llm_choice}")
+                client_openai = client
 
-            logger.info(f"LLM details : model {model_id}")
-            if not use_anthropic:
-                logger.info(f"API base URL: {client_openai.base_url}")
-
-            logger.info(f"LLM query : {system_message + ' ' + query}")
+            # Lazy %-formatting: the (possibly large) prompt is only
+            # interpolated when INFO records are actually emitted
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("LLM details : model %s", model_id)
+                if not use_anthropic:
+                    logger.info("API base URL: %s", client_openai.base_url)
+                logger.info("LLM query : %s %s", system_message, query)
 
             start_time = time.time()
 
+            request = _request_kwargs(model_id, use_anthropic, system_message, query)
             if use_anthropic:
-                # Handle Anthropic API
-                response = client_anthropic.messages.create(
-                    model=model_id,
-                    system=system_message,
-                    messages=[
-                        {"role": "user", "content": system_message + " " + query}
-                    ],
-                    max_tokens=4096
-                )
-                reply = response.content[0].text
-            elif model_id == "o1-mini":
-                # o1-mini model does not support role system or max_tokens
-                logger.warning(f"No support for role system or max_tokens in model {model_id}.")
-                response = client_openai.chat.completions.create(
-                    model=model_id,
-                    messages=[
-                        {"role": "user", "content": system_message + " " + query},
-                    ],
-                    max_completion_tokens=1000,
-                )
-                if response and response.choices:
-                    reply = (getattr(response.choices[0].message, "content", "") or "").strip()
+                response = client_anthropic.messages.create(**request)
             else:
-                response = client_openai.chat.completions.create(
-                    model=model_id,
-                    messages=[
-                        {"role": "system", "content": system_message},
-                        {"role": "user", "content": query},
-                    ],
-                    max_tokens=16384,
-                )
-                if response and response.choices:
-                    reply = (getattr(response.choices[0].message, "content", "") or "").strip()
+                response = client_openai.chat.completions.create(**request)
+            reply = _extract_reply(response, use_anthropic)
 
             end_time = time.time()
             if use_anthropic:
-                logger.info(f"Anthropic {model_id} response in {end_time - start_time:.2f} sec")
+                logger.info("Anthropic %s response in %.2f sec (cache read %s tokens)", model_id, end_time - start_time,
+                            getattr(response.usage, "cache_read_input_tokens", None))
             else:
-                logger.info(f"LLM {model_id} at {client_openai.base_url} response in {end_time - start_time:.2f} sec : {response}")
+                logger.info("LLM %s at %s response in %.2f sec : %s", model_id, client_openai.base_url, end_time - start_time, response)
 
             if reply:
                 print(f"Received response in {end_time - start_time:.2f} sec ")
@@ -166,31 +256,165 @@ def send_query_to_llm(system_message, query, llm_choice = None):
             else:
                 attempt += 1
                 logger.warning(f"Empty reply received. Retrying... (attempt {attempt}/{max_attempts})")
-                time.sleep(1)  # wait for 1 second before retrying
+                delay = _retry_delay(attempt)
 
-        except (openai.OpenAIError, anthropic.APIError) as e:
+        except sdk_error as e:
             logger.error(f"An error occurred with model {model_id}: {e} for query : {query}")
             attempt += 1
-            time.sleep(1)
+            delay = _retry_delay(attempt, e, sdk)
+            if delay is None:
+                break  # e.g. bad credentials: retrying cannot help
+
+        if attempt < max_attempts:
+            time.sleep(delay)
+
+    if not reply:
+        logger.warning("No content received after retries.")
+    return reply
+
+_BATCH_DELIMITER = "\n---\n"
 
+def _parse_batched_reply(reply, expected):
+    """Return the list of answers from a batched reply, or None if it doesn't parse"""
     if not reply:
+        return None
+    start, end = reply.find("["), reply.rfind("]")
+    if start == -1 or end <= start:
+        return None
+    try:
+        answers = json.loads(reply[start:end + 1])
+    except ValueError:
+        return None
+    if not isinstance(answers, list) or len(answers) != expected:
+        return None
+    return [a if isinstance(a, str) else json.dumps(a) for a in answers]
+
+def send_batched_query_to_llm(system_message, queries, llm_choice=None, batch_size=10):
+    """
+    Answer several queries sharing one system message with as few LLM calls as possible.
+
+    Queries are packed batch_size at a time into a single prompt that asks for a
+    JSON array of answers in order. Batches whose reply doesn't parse fall back
+    to one send_query_to_llm call per query.
+
+    Returns:
+        List of replies (or None for failed queries) in the same order as queries
+    """
+    replies = []
+    for i in range(0, len(queries), batch_size):
+        batch = queries[i:i + batch_size]
+        if len(batch) == 1:
+            replies.append(send_query_to_llm(system_message, batch[0], llm_choice))
+            continue
+
+        batch_system = (
+            system_message
+            + f" You will receive {len(batch)} items separated by '---'. Answer each one independently."
+            " Respond with only a JSON array of strings, one answer per item, in the same order."
+        )
+        batch_query = _BATCH_DELIMITER.join(f"Item {n}:\n{q}" for n, q in enumerate(batch, 1))
+        answers = _parse_batched_reply(send_query_to_llm(batch_system, batch_query, llm_choice), len(batch))
+        if answers is None:
+            logger.warning(f"Batched reply for {len(batch)} queries did not parse; sending them one at a time")
+            answers = [send_query_to_llm(system_message, q, llm_choice) for q in batch]
+        replies.extend(answers)
+    return replies
+
+# Async clients are created once per LLM choice and reused across calls
+_ASYNC_CLIENTS = {}
+
+def _get_async_client(llm_choice):
+    """Return (client, model_id, use_anthropic) using a shared async client"""
+    api_key, base_url, model_id, use_anthropic = _llm_settings(llm_choice)
+    client = _ASYNC_CLIENTS.get(llm_choice)
+    if client is None:
+        sdk, _ = _provider_sdk(use_anthropic)
+        if use_anthropic:
+            client = sdk.AsyncAnthropic(api_key=api_key)
+        else:
+            client = sdk.AsyncOpenAI(api_key=api_key, base_url=base_url)
+        _ASYNC_CLIENTS[llm_choice] = client
+    return client, model_id, use_anthropic
+
+async def send_query_to_llm_async(system_message, query, llm_choice=None):
+    """Async variant of send_query_to_llm so several queries can run concurrently"""
+    llm_choice = llm_choice or LLM_CHOICE
+    key = _cache_key(system_message, query, llm_choice)
+    cached = cache.get(key, default=_MISS)
+    if cached is not _MISS:
+        logger.info("Memoize: Cache hit for send_query_to_llm_async")
+        return cached
+
+    client, model_id, use_anthropic = _get_async_client(llm_choice)
+    sdk, sdk_error = _provider_sdk(use_anthropic)
+    request = _request_kwargs(model_id, use_anthropic, system_message, query)
+    max_attempts = 3
+    reply = None
+
+    for attempt in range(1, max_attempts + 1):
+        try:
+            start_time = time.time()
+            if use_anthropic:
+                response = await client.messages.create(**request)
+            else:
+                response = await client.chat.completions.create(**request)
+            reply = _extract_reply(response, use_anthropic)
+            logger.info(f"LLM {model_id} async response in {time.time() - start_time:.2f} sec")
+            if reply:
+                break
+            logger.warning(f"Empty reply received. Retrying... (attempt {attempt}/{max_attempts})")
+            delay = _retry_delay(attempt)
+        except sdk_error as e:
+            logger.error(f"An error occurred with model {model_id}: {e} for query : {query}")
+            delay = _retry_delay(attempt, e, sdk)
+            if delay is None:
+                break
+        if attempt < max_attempts:
+            await asyncio.sleep(delay)
+
+    if reply:
+        cache.set(key, reply, expire=LLM_CACHE_TTL)
+    else:
         logger.warning("No content received after retries.")
     return reply
 
+async def send_queries_batch(pairs, llm_choice=None, concurrency=5):
+    """
+    Send several (system_message, query) pairs concurrently.
+
+    Args:
+        pairs: Iterable of (system_message, query) tuples
+        llm_choice: LLM to use for every query (default: LLM_CHOICE)
+        concurrency: Maximum number of requests in flight at once (default: 5)
+
+    Returns:
+        List of replies (or None for failed queries) in the same order as pairs
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _bounded(system_message, query):
+        async with semaphore:
+            return await send_query_to_llm_async(system_message, query, llm_choice)
+
+    return await asyncio.gather(*(_bounded(s, q) for s, q in pairs))
+
 def send_query_to_llm_assistant(system_message, query, timeout=120, initial_backoff=1, max_backoff=8):
     """
-    Send a query to the OpenAI Assistant API with improved polling mechanism.
+    Send a query to the OpenAI Assistant API, streaming the run to completion.
 
     Args:
         system_message: Context or system instructions
         query: The user's query
         timeout: Maximum time to wait for response in seconds (default: 120)
-        initial_backoff: Starting backoff time in seconds (default: 1)
-        max_backoff: Maximum backoff time in seconds (default: 8)
+        initial_backoff: Unused; kept for backward compatibility (runs are streamed, not polled)
+        max_backoff: Unused; kept for backward compatibility
 
     Returns:
         Assistant's response text or None if failed
     """
+    import threading
+    import openai
+
     # Your existing assistant ID
     assistant_id = "asst_wVAbvVr13ugq6taXj7jfquAX"
 
@@ -213,55 +437,55 @@ def send_query_to_llm_assistant(system_message, query, timeout=120, initial_back
         )
         logger.info(f"User: {user_message}")
 
-        # Step 3: Run the assistant
-        run = openai.beta.threads.runs.create(
-            thread_id=thread.id,
-            assistant_id=assistant_id
-        )
-
-        # Step 4: Wait for the run to complete with exponential backoff
+        # Step 3: Run the assistant as a server-sent event stream, so completion
+        # is pushed to us instead of discovered by polling runs.retrieve
         logger.info("Waiting for assistant to respond...")
         start_time = time.time()
-        current_backoff = initial_backoff
+        timed_out = threading.Event()
 
-        while True:
-            # Check if we've exceeded timeout
-            if time.time() - start_time > timeout:
+        with openai.beta.threads.runs.stream(
+            thread_id=thread.id,
+            assistant_id=assistant_id,
+            timeout=timeout,
+        ) as stream:
+            def _expire():
+                timed_out.set()
+                stream.close()
+
+            # Enforce the overall deadline; the request timeout only bounds each read
+            timer = threading.Timer(timeout, _expire)
+            timer.daemon = True
+            timer.start()
+            try:
+                stream.until_done()
+            except Exception:
+                if not timed_out.is_set():
+                    raise
+            finally:
+                timer.cancel()
+
+            if timed_out.is_set():
                 logger.error(f"Assistant API timeout after {timeout} seconds")
                 return None
 
-            # Get current run status
-            run_status = openai.beta.threads.runs.retrieve(
-                thread_id=thread.id,
-                run_id=run.id
-            )
-
-            if run_status.status == "completed":
-                logger.info(f"Assistant run completed in {time.time() - start_time:.2f} seconds")
-                break
-            elif run_status.status == "requires_action":
+            run = stream.get_final_run()
+            if run.status == "requires_action":
                 # Handle tool calls if needed in the future
                 logger.error("Run requires action, but tool handling not implemented")
                 return None
-            elif run_status.status in ["failed", "cancelled", "expired"]:
-                error_details = getattr(run_status, "last_error", "No error details available")
+            elif run.status != "completed":
+                error_details = getattr(run, "last_error", "No error details available")
                 logger.error(f"Run failed. Error details: {error_details}")
-                logger.error(f"Run ended with status: {run_status.status}")
+                logger.error(f"Run ended with status: {run.status}")
                 return None
 
-            # Sleep with exponential backoff
-            logger.debug(f"Waiting {current_backoff}s for assistant response...")
-            time.sleep(current_backoff)
-            current_backoff = min(current_backoff * 2, max_backoff)
-
-        # Step 5: Retrieve and log the assistant's response
-        messages = openai.beta.threads.messages.list(thread_id=thread.id)
+            logger.info(f"Assistant run completed in {time.time() - start_time:.2f} seconds")
 
-        # Show the latest assistant reply
-        for msg in messages.data[::-1]:  # Reverse to get latest first
-            if msg.role == "assistant":
-                logger.info(f"\nAssistant response received")
-                return msg.content[0].text.value
+            # Step 4: Return the assistant's latest reply from the streamed messages
+            for msg in reversed(stream.get_final_messages()):
+                if msg.role == "assistant" and msg.content:
+                    logger.info(f"\nAssistant response received")
+                    return msg.content[0].text.value
 
         logger.warning("No assistant response found.")
         return None
@@ -271,4 +495,4 @@ def send_query_to_llm_assistant(system_message, query, timeout=120, initial_back
         return None
     except Exception as e:
         logger.error(f"Unexpected error in send_query_to_llm_assistant: {str(e)}", exc_info=True)
-        return None
\ No newline at end of file
+        return None
@@ -1,7 +1,39 @@
 import logging
 import sys
 import os
-from logging.handlers import RotatingFileHandler
+import queue
+import atexit
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
+
+# Shared by every handler; a Formatter is stateless so one instance suffices
+_FORMATTER = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+# Background listeners that do the actual file/console writes; keyed by logger name
+_LISTENERS = {}
+
+def _attach_queued_handlers(target_logger, *handlers):
+    """Attach handlers to a logger behind a QueueHandler.
+
+    Emitting a record only enqueues it; a QueueListener thread does the
+    formatting, disk writes and log rotation off the caller's thread.
+    """
+    previous = _LISTENERS.pop(target_logger.name, None)
+    if previous is not None:
+        previous.stop()
+
+    log_queue = queue.SimpleQueue()
+    target_logger.addHandler(QueueHandler(log_queue))
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    _LISTENERS[target_logger.name] = listener
+
+def _stop_listeners():
+    """Flush queued records on interpreter exit"""
+    for listener in _LISTENERS.values():
+        listener.stop()
+    _LISTENERS.clear()
+
+atexit.register(_stop_listeners)
 
 def setup_logging():
     """Configure application logging"""
@@ -34,16 +66,14 @@ def setup_logging():
         maxBytes=1024*1024,
         backupCount=3
     )
-    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-    file_handler.setFormatter(formatter)
+    file_handler.setFormatter(_FORMATTER)
     file_handler.setLevel(logging.DEBUG)
-    root_logger.addHandler(file_handler)
 
     # Add console handler to root logger only
     console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setFormatter(formatter)
+    console_handler.setFormatter(_FORMATTER)
     console_handler.setLevel(logging.DEBUG)
-    root_logger.addHandler(console_handler)
+    _attach_queued_handlers(root_logger, file_handler, console_handler)
 
     # Setup specific handler for httpcore logs
     setup_httpcore_logging()
@@ -80,10 +110,9 @@ def setup_httpcore_logging():
         maxBytes=1024*1024,
         backupCount=2
     )
-    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-    http_file_handler.setFormatter(formatter)
+    http_file_handler.setFormatter(_FORMATTER)
     http_file_handler.setLevel(logging.DEBUG)
-    http_logger.addHandler(http_file_handler)
+    _attach_queued_handlers(http_logger, http_file_handler)
 
     http_logger.info("HTTP logger initialized successfully")
 
@@ -105,10 +134,9 @@ def setup_openai_logging():
         maxBytes=1024*1024,
         backupCount=2
     )
-    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-    openai_file_handler.setFormatter(formatter)
+    openai_file_handler.setFormatter(_FORMATTER)
     openai_file_handler.setLevel(logging.DEBUG)
-    openai_logger.addHandler(openai_file_handler)
+    _attach_queued_handlers(openai_logger, openai_file_handler)
 
     openai_logger.info("OpenAI logger initialized successfully")
 
@@ -1,12 +1,18 @@
 
 ### importing libraries
-import yfinance as yf
+# yfinance, matplotlib and seaborn are imported inside the functions that use
+# them, so importing this module (or just viewing the portfolio) stays cheap
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 import csv
+import diskcache
 from datetime import date,timedelta
+
+# On-disk cache for Yahoo Finance lookups: quotes expire after 5 minutes,
+# historical series after a day and fundamentals after an hour
+price_cache = diskcache.Cache("price_cache")
+QUOTE_TTL = 300
+HISTORY_TTL = 86400
 # Function to load portfolio from CSV
 def load_portfolio(csv_file):
     try:
@@ -24,21 +30,37 @@ def display_portfolio(portfolio):
         print("No portfolio data to display.")
 
 # Function to get the current stock price from Yahoo Finance
+@price_cache.memoize(expire=QUOTE_TTL)
 def get_stock_price(ticker):
+    import yfinance as yf
     stock = yf.Ticker(ticker)
     todays_data = stock.history(period="1d")
     return todays_data['Close'].iloc[0]
+# Function to get the latest closing prices for many tickers in one request
+@price_cache.memoize(expire=QUOTE_TTL)
+def get_stock_prices(tickers):
+    closes = _download_closes(tickers, period="1d")
+    # Tickers trade on different days (crypto on weekends, exchange holidays),
+    # so carry each column's last close down to the newest row
+    return closes.ffill().iloc[-1]
 # Function to get risk free rate
+@price_cache.memoize(expire=QUOTE_TTL)
 def get_risk_free_rate():
+    import yfinance as yf
     treasury = yf.Ticker("^TNX")
     data = treasury.history(period="1d")
     return data['Close'].iloc[-1] / 100
-#Function to get P/E Ratio
-def calculate_pe_ratio(stock_symbol):
+#Function to get (price, trailing EPS, earnings growth) with one history and one .info fetch
+@price_cache.memoize(expire=3600)
+def _fundamentals(stock_symbol):
+    import yfinance as yf
     stock = yf.Ticker(stock_symbol)
     stock_price = stock.history(period='1d')['Close'].iloc[0]
-    eps = stock.info.get('trailingEps', None)
-    growth_rate = stock.info.get('earningsGrowth', None)
+    info = stock.info
+    return stock_price, info.get('trailingEps', None), info.get('earningsGrowth', None)
+#Function to get P/E Ratio
+def calculate_pe_ratio(stock_symbol):
+    stock_price, eps, growth_rate = _fundamentals(stock_symbol)
     if eps and eps != 0:  # Make sure EPS is not None or zero
         pe_ratio = stock_price / eps
     else:
@@ -46,11 +68,8 @@ def calculate_pe_ratio(stock_symbol):
     return pe_ratio
 #Function to get PEG Ratio
 def calculate_peg_ratio(stock_symbol):
-    stock = yf.Ticker(stock_symbol)
-    stock_price = stock.history(period='1d')['Close'].iloc[0]
-    eps = stock.info.get('trailingEps', None)
-    growth_rate = stock.info.get('earningsGrowth', None)
-    pe_ratio =calculate_pe_ratio(stock_symbol)
+    _, _, growth_rate = _fundamentals(stock_symbol)
+    pe_ratio = calculate_pe_ratio(stock_symbol)  # reuses the cached fundamentals
     if pe_ratio and growth_rate:
         peg_ratio = pe_ratio / (growth_rate * 100)
     else:
@@ -73,9 +92,9 @@ def buy_stock(ticker, quantity, portfolio):
         return portfolio
 
     value = quantity * price  # Calculate total value of the purchase
-    if ticker in portfolio['Ticker'].values:
-        portfolio.loc[portfolio['Ticker'] == ticker, 'Shares'] += quantity
-        portfolio.loc[portfolio['Ticker'] == ticker, 'Value'] += value
+    rows = portfolio.index[portfolio['Ticker'] == ticker]  # single scan for the ticker's rows
+    if len(rows):
+        portfolio.loc[rows, ['Shares', 'Value']] += [quantity, value]
         print(f"Updated {ticker} with {quantity} additional shares.")
     else:
         new_entry = pd.DataFrame({
@@ -99,17 +118,16 @@ def sell_stock(ticker, quantity, portfolio):
         print(f"Error fetching stock price for {ticker}: {e}")
         return portfolio
 
-    if ticker in portfolio['Ticker'].values:
-        current_shares = portfolio.loc[portfolio['Ticker'] == ticker, 'Shares'].iloc[0]
+    rows = portfolio.index[portfolio['Ticker'] == ticker]  # single scan for the ticker's rows
+    if len(rows):
+        current_shares = portfolio.at[rows[0], 'Shares']
         if current_shares < quantity:
             print("Not enough shares available.")
         else:
-            portfolio.loc[portfolio['Ticker'] == ticker, 'Shares'] -= quantity
-            portfolio.loc[portfolio['Ticker'] == ticker, 'Value'] -= quantity * price
+            portfolio.loc[rows, ['Shares', 'Value']] -= [quantity, quantity * price]
 
             # Ensure Value doesn't go below zero
-            if portfolio.loc[portfolio['Ticker'] == ticker, 'Value'].iloc[0] < 0:
-                portfolio.loc[portfolio['Ticker'] == ticker, 'Value'] = 0
+            portfolio.loc[rows, 'Value'] = portfolio.loc[rows, 'Value'].clip(lower=0)
 
             print(f"Sold {quantity} shares of {ticker}.")
     else:
@@ -119,21 +137,45 @@ def sell_stock(ticker, quantity, portfolio):
 
 # Function to update portfolio values with real-time prices
 def update_portfolio_with_real_time_prices(portfolio):
-    for i, row in portfolio.iterrows():
-        ticker = row['Ticker']
-        try:
-            current_price = get_stock_price(ticker)
-            portfolio.at[i, 'Value'] = row['Shares'] * current_price
-        except Exception as e:
-            print(f"Error updating {ticker}: {e}")
+    if portfolio.empty:
+        return portfolio
+    try:
+        prices = get_stock_prices(tuple(portfolio['Ticker'].unique()))
+    except Exception as e:
+        print(f"Error fetching prices: {e}")
+        return portfolio
+    current_prices = portfolio['Ticker'].map(prices).astype(float)
+    missing = current_prices.isna()
+    for ticker in portfolio.loc[missing, 'Ticker']:
+        print(f"Error updating {ticker}: no price returned")
+    # One column-wide assignment; rows without a quote keep their old Value
+    portfolio['Value'] = (portfolio['Shares'] * current_prices).where(~missing, portfolio['Value'])
     return portfolio
 
 # Function to get historical data for a given stock
+@price_cache.memoize(expire=HISTORY_TTL)
 def get_historical_data(ticker, period="1y"):
+    import yfinance as yf
     stock = yf.Ticker(ticker)
     hist_data = stock.history(period=period)
     return hist_data['Close']
 
+# Function to download closing prices for many tickers with a single
+# yf.download call (one column per ticker on a shared date index)
+def _download_closes(tickers, period):
+    import yfinance as yf
+    tickers = list(tickers)
+    data = yf.download(tickers, period=period, group_by='column', auto_adjust=False, threads=True, progress=False)
+    closes = data['Close']
+    if isinstance(closes, pd.Series):
+        closes = closes.to_frame(tickers[0])
+    return closes[tickers]
+
+# Function to get historical closing prices for many tickers
+@price_cache.memoize(expire=HISTORY_TTL)
+def get_historical_prices(tickers, period="1y"):
+    return _download_closes(tickers, period)
+
 # Function to calculate returns from price data
 def calculate_returns(price_series):
     returns = price_series.pct_change().dropna()
@@ -147,38 +189,31 @@ def calculate_market_returns(market_ticker="^GSPC", period="1y"):
 
 # Function to calculate portfolio returns
 def calculate_portfolio_returns(portfolio, period="1y"):
-    portfolio_returns = None
     total_value = portfolio['Value'].sum()
-    for _, row in portfolio.iterrows():
-        ticker = row['Ticker']
-        stock_value = row['Value']
-        stock_weight = stock_value / total_value
-
-        stock_prices = get_historical_data(ticker, period)
-        stock_returns = calculate_returns(stock_prices)
-
-        if portfolio_returns is None:
-            portfolio_returns = stock_weight * stock_returns
-        else:
-            portfolio_returns += stock_weight * stock_returns
-
+    prices = get_historical_prices(tuple(portfolio['Ticker'].unique()), period)
+    # (T, N) returns matrix times (N,) weight vector; like summing the aligned
+    # per-stock series, only dates where every stock has a return are kept
+    weights = (portfolio.groupby('Ticker')['Value'].sum() / total_value).reindex(prices.columns)
+    returns = prices.pct_change(fill_method=None).dropna()
+    portfolio_returns = pd.Series(returns.to_numpy() @ weights.to_numpy(), index=returns.index)
     return portfolio_returns
+@price_cache.memoize(expire=HISTORY_TTL)
 def calculate_beta(stock_symbol, market_symbol="^GSPC", start_date=None, end_date=date.today()):
+    import yfinance as yf
     if start_date is None:
         start_date = end_date - timedelta(days=365)
-    stock_data = yf.download(stock_symbol, start=start_date, end=end_date)
-    market_data = yf.download(market_symbol, start=start_date, end=end_date)
-    stock_data['Return'] = stock_data['Adj Close'].pct_change()
-    market_data['Return'] = market_data['Adj Close'].pct_change()
-    stock_data = stock_data.dropna()
-    market_data = market_data.dropna()
-    covariance = np.cov(stock_data['Return'], market_data['Return'])[0, 1]
-    variance = market_data['Return'].var()
-    beta = covariance / variance
+    # One download for both symbols gives returns on a shared date index, so
+    # the covariance is computed over the same (inner-joined) trading days
+    prices = yf.download([stock_symbol, market_symbol], start=start_date, end=end_date,
+                         auto_adjust=False, progress=False)['Adj Close']
+    returns = prices[[stock_symbol, market_symbol]].pct_change(fill_method=None).dropna()
+    cov = np.cov(returns.to_numpy(), rowvar=False)
+    beta = cov[0, 1] / cov[1, 1]
     return beta
 
 # Function to visualize the portfolio beta
 def visualize_portfolio_beta(portfolio, market_ticker="^GSPC", period="1y"):
+    import matplotlib.pyplot as plt
     portfolio_returns = calculate_portfolio_returns(portfolio, period)
     market_returns = calculate_market_returns(market_ticker, period)
     aligned_returns = pd.DataFrame({
@@ -198,28 +233,25 @@ def visualize_portfolio_beta(portfolio, market_ticker="^GSPC", period="1y"):
 
 # Function to create a heatmap of portfolio stock correlations
 def Heatmap_of_portfolio(portfolio, period="1y"):
-    stock_returns = {}
-    for _, row in portfolio.iterrows():
-        ticker = row['Ticker']
-        stock_returns[ticker] = calculate_returns(get_historical_data(ticker, period))
-    returns_df = pd.DataFrame(stock_returns)
-    corr_matrix = returns_df.corr()
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    # The batched download is already aligned on one date index, so the
+    # correlation runs straight on its returns matrix (pairwise NaN handling)
+    prices = get_historical_prices(tuple(portfolio['Ticker'].unique()), period)
+    corr_matrix = prices.pct_change(fill_method=None).corr()
     plt.figure(figsize=(5, 5))
-    sns.heatmap(corr_matrix, annot=True, cmap='coolwarm', center=0, linewidths=1, linecolor='black')
+    sns.heatmap(corr_matrix.to_numpy(), xticklabels=corr_matrix.columns, yticklabels=corr_matrix.index, annot=True, cmap='coolwarm', center=0, linewidths=1, linecolor='black')
     plt.title('Stock Correlation Heatmap', fontsize=16)
     plt.show()
 def visualize_sharpe_ratio_distribution(portfolio, risk_free_rate, period="1y"):
-    sharpe_ratios = []
-    for _, row in portfolio.iterrows():
-        ticker = row['Ticker']
-        stock_prices = get_historical_data(ticker, period)
-        stock_returns = calculate_returns(stock_prices)
-        avg_return = stock_returns.mean()
-        std_dev = stock_returns.std()
-        sharpe_ratio = (avg_return - risk_free_rate) / std_dev
-        sharpe_ratios.append(sharpe_ratio)
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    prices = get_historical_prices(tuple(portfolio['Ticker'].unique()), period)
+    # Column-wise mean/std over the (T, N) returns matrix; NaNs are skipped per stock
+    returns = prices.pct_change(fill_method=None)
+    sharpe_ratios = (returns.mean() - risk_free_rate) / returns.std()
     plt.figure(figsize=(5, 5))
-    sns.histplot(sharpe_ratios, bins=10, kde=True)
+    sns.histplot(sharpe_ratios.to_numpy(), bins=10, kde=True)
     plt.title('Sharpe Ratio Distribution', fontsize=16)
     plt.xlabel('Sharpe Ratio', fontsize=12)
     plt.ylabel('Frequency', fontsize=12)
@@ -227,56 +259,61 @@ def visualize_sharpe_ratio_distribution(portfolio, risk_free_rate, period="1y"):
     plt.show()
 
 # Main Program Loop
-portfolio = load_portfolio("portfolio.csv")
-update_portfolio_with_real_time_prices(portfolio)
+def main():
+    portfolio = load_portfolio("portfolio.csv")
+    portfolio = update_portfolio_with_real_time_prices(portfolio)
 
-while True:
-    print("\nPress (1) for Buying stock")
-    print("Press (2) for Selling stock")
-    print("Press (3) for Viewing portfolio")
-    print("Press (4) for Visualization of risk metrics")
-    print("Press (5) for Stock Analysis")
-    print("Press (6) for Exit")
-    choice = input("Enter choice: ")
+    while True:
+        print("\nPress (1) for Buying stock")
+        print("Press (2) for Selling stock")
+        print("Press (3) for Viewing portfolio")
+        print("Press (4) for Visualization of risk metrics")
+        print("Press (5) for Stock Analysis")
+        print("Press (6) for Exit")
+        choice = input("Enter choice: ")
 
-    if choice == '1':
-        ticker = input("Enter ticker according to Yahoo Finance: ")
-        qty = int(input("Enter number of shares: "))
-        portfolio = buy_stock(ticker, qty, portfolio)
-        save_portfolio(portfolio, "portfolio.csv")
-    elif choice == '2':
-        ticker = input("Enter ticker according to Yahoo Finance: ")
-        qty = int(input("Enter number of shares: "))
-        portfolio = sell_stock(ticker, qty, portfolio)
-        save_portfolio(portfolio, "portfolio.csv")
-    elif choice == '3':
-        display_portfolio(portfolio)
-    elif choice == '4':
-        while True:
-            print("\nPress (1) for Beta Scatter plot")
-            print("Press (2) for Sharpe Ratio Distribution Chart")
-            print("Press (3) for Heatmap")
-            print("Press (4) for Exit")
-            ch = input("Enter choice: ")
-            if ch == '1':
-                print(f"beta is {visualize_portfolio_beta(portfolio):.2f}")
-            elif ch == '2':
-                risk_free_rate = get_risk_free_rate()
-                visualize_sharpe_ratio_distribution(portfolio, risk_free_rate)
-            elif ch == '3':
-                Heatmap_of_portfolio(portfolio)
-            elif ch == '4':
-                print("Exited Visualization Menu")
-                break
-            else:
-                print("Invalid choice")
-    elif choice=='5':
-        ticker=input("Enter ticker according to Yahoo Finance: ")
-        print(f"The Beta of the Stock is {calculate_beta(ticker.upper()):.2f}")
-        print(f"The P/E Ratio of the Stock is {calculate_pe_ratio(ticker.upper()):.2f}")
-        print(f"The PEG Ratio of the Stock is {calculate_peg_ratio(ticker.upper()):.2f}")
-    elif choice == '6':
-        print("Thank you for using the Portfolio Visualizer!")
-        break
-    else:
-        print("Invalid input, please choose again.")
+        if choice == '1':
+            ticker = input("Enter ticker according to Yahoo Finance: ")
+            qty = int(input("Enter number of shares: "))
+            portfolio = buy_stock(ticker, qty, portfolio)
+            save_portfolio(portfolio, "portfolio.csv")
+        elif choice == '2':
+            ticker = input("Enter ticker according to Yahoo Finance: ")
+            qty = int(input("Enter number of shares: "))
+            portfolio = sell_stock(ticker, qty, portfolio)
+            save_portfolio(portfolio, "portfolio.csv")
+        elif choice == '3':
+            display_portfolio(portfolio)
+        elif choice == '4':
+            while True:
+                print("\nPress (1) for Beta Scatter plot")
+                print("Press (2) for Sharpe Ratio Distribution Chart")
+                print("Press (3) for Heatmap")
+                print("Press (4) for Exit")
+                ch = input("Enter choice: ")
+                if ch == '1':
+                    print(f"beta is {visualize_portfolio_beta(portfolio):.2f}")
+                elif ch == '2':
+                    risk_free_rate = get_risk_free_rate()
+                    visualize_sharpe_ratio_distribution(portfolio, risk_free_rate)
+                elif ch == '3':
+                    Heatmap_of_portfolio(portfolio)
+                elif ch == '4':
+                    print("Exited Visualization Menu")
+                    break
+                else:
+                    print("Invalid choice")
+        elif choice=='5':
+            ticker=input("Enter ticker according to Yahoo Finance: ")
+            print(f"The Beta of the Stock is {calculate_beta(ticker.upper()):.2f}")
+            print(f"The P/E Ratio of the Stock is {calculate_pe_ratio(ticker.upper()):.2f}")
+            print(f"The PEG Ratio of the Stock is {calculate_peg_ratio(ticker.upper()):.2f}")
+        elif choice == '6':
+            print("Thank you for using the Portfolio Visualizer!")
+            break
+        else:
+            print("Invalid input, please choose again.")
+
+
+if __name__ == "__main__":
+    main()
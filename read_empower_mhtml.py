@@ -52,8 +52,14 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 # Extract portfolio as formatted text (no CSV):
 #   python read_empower_mhtml.py portfolio.mhtml --portfolio --no-csv
 #
+# Process every MHTML file in the current directory in parallel:
+#   python read_empower_mhtml.py --all
+#
 # DEPENDENCIES:
 # - BeautifulSoup4 (bs4): For HTML parsing
+# - numpy: Column totals and sorting for the holdings
+# - lxml (optional): Faster HTML parser for BeautifulSoup
+# - google-re2 (optional): Linear-time engine for the holdings scan (EMPOWER_USE_RE2=1)
 # - email: For parsing MHTML format
 # - argparse: For command-line argument handling
 # -----------------------------------------------------------------------------
@@ -65,44 +71,197 @@ import sys
 import glob
 import re
 import csv
+import operator
 import email
 from email import policy
+import importlib.util
+import hashlib
+import json
 import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def extract_mhtml_text(file_path):
-    """Extract text content from an MHTML file."""
+# Numeric fields in the entry patterns use possessive quantifiers (++) so a
+# failed match never backtracks into a run of digits or whitespace. They
+# need Python 3.11+; older versions get the equivalent plain greedy form.
+def _possessive(pattern):
+    return pattern if sys.version_info >= (3, 11) else pattern.replace("++", "+")
+
+# Translation table that deletes currency symbols and thousands separators
+_STRIP = str.maketrans('', '', '$,')
+# Same, also dropping the sign (re-applied as a leading '-' for Day $)
+_STRIP_SIGNED = str.maketrans('', '', '$,-')
+
+def _parse_money(raw, sign_first=False):
+    """
+    Clean a money string in one translate pass and parse it once.
+    Returns (clean string, float). sign_first moves a '-' found anywhere in
+    the text to the front ("$-5.00" -> "-5.00"). Unparsable text counts as 0.0.
+    """
+    if sign_first:
+        clean = ('-' if '-' in raw else '') + raw.translate(_STRIP_SIGNED)
+    else:
+        clean = raw.translate(_STRIP)
     try:
-        # Read the MHTML file
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as file:
-            mhtml_content = file.read()
+        return clean, float(clean)
+    except ValueError:
+        return clean, 0.0
+
+# Regex patterns used by the holdings extractor, compiled once at import
+_GRAND_TOTAL_RE = re.compile(r'Grand total\s+([+-]?\$[\d,]+\.\d+)\s+\$([\d,]+\.\d+)')
+# Column headings of the holdings table, as used by the DOM extractor
+_HOLDINGS_COLUMNS = ("Holding", "Shares", "Price", "Change", "1 Day %", "1 day $", "Value")
+# Holdings CSV columns, with Name before Ticker
+_CSV_FIELDS = ("Name", "Ticker", "Shares", "Price", "Change", "Day_Percent", "Day_Dollar", "Value")
+_HOLDINGS_HDR_RE = re.compile(r"Holding\s+Shares\s+Price\s+Change\s+1 Day %\s+1 day \$\s+Value")
+# Standard entries for stocks
+_STANDARD_RE = re.compile(_possessive(r'([A-Z0-9\.\-]+)(?:\s+([^\n]+?))\s++(\d++(?:\.\d++)?)\s++\$(\d++(?:\.\d++)?)\s++\$?([-+]?\d++(?:\.\d++)?)\s++([-+]?\d++(?:\.\d++)?%)\s++([-+]?\$\d++(?:,\d++)*(?:\.\d++)?)\s++\$(\d++(?:,\d++)*(?:\.\d++)?)'))
+# Alternative stock layout (different spacing or formatting)
+_ALT_RE = re.compile(_possessive(r'([A-Z0-9\.\-]+)\s+([^\n]+?)\s++(\d++(?:\.\d++)?)\s++\$(\d++(?:\.\d++)?(?:,\d++)*)\s++([-+]?[^\s]++)\s++([-+]\d++(?:\.\d++)?%)\s++([-+]\$\d++(?:,\d++)*(?:\.\d++)?)\s++\$(\d++(?:,\d++)*(?:\.\d++)?)'))
+# Cash entries
+_CASH_RE = re.compile(_possessive(r'Cash\s++(\d++(?:\.\d++)?)\s++\$(\d++(?:\.\d++)?)\s++\$?([-+]?\d++(?:\.\d++)?)\s++([-+]?\d++(?:\.\d++)?%)\s++([-+]?\$\d++(?:,\d++)*(?:\.\d++)?)\s++\$(\d++(?:,\d++)*(?:\.\d++)?)'))
+# Generic cryptocurrency entries
+_CRYPTO_RE = re.compile(_possessive(r'([A-Z0-9]+\.COIN|[A-Z]{3,5})[^\n]*?\s+([A-Z0-9]+|[^\n]+?)\s++(\d++\.\d++)\s++\$([0-9,.]++)\s++([-+]?\$?[0-9,.]++)\s++([-+][0-9.]++%)\s++([-+]\$[0-9,.]++)\s++\$([0-9,.]++)'))
+# Catch-all for one-field-per-line entries
+_CATCHALL_RE = re.compile(_possessive(r'([A-Z0-9\.\-]+)[^\n]*?\n([^\n]+?)\n(\d++(?:\.\d++)?)\n\$(\d++(?:\.\d++)?)\n\$?([-+]?\d++(?:\.\d++)?)\n([-+]?\d++(?:\.\d++)?%)\n([-+]?\$\d++(?:,\d++)*(?:\.\d++)?)\n\$(\d++(?:,\d++)*(?:\.\d++)?)'))
+# MHTML-specific formatting
+_MHTML_RE = re.compile(_possessive(r'([A-Z0-9\.\-]+)\s+([^\n]+?)\s++(\d++(?:\.\d++)?)\s++\$([\d,.]++)\s++([-+]?\$?[\d,.]++)\s++([-+][\d,.]++%)\s++([-+]\$[\d,.]++)\s++\$([\d,.]++)'))
+
+# All entry layouts as one alternation, in priority order, so the holdings
+# section is scanned once; m.lastgroup names the layout that matched
+_ENTRY_LAYOUTS = (
+    ("standard", _STANDARD_RE),
+    ("alt_stock", _ALT_RE),
+    ("cash", _CASH_RE),
+    ("crypto", _CRYPTO_RE),
+    ("catchall", _CATCHALL_RE),
+    ("mhtml", _MHTML_RE),
+)
+_ENTRY_PATTERN = "|".join(f"(?P<{tag}>{rx.pattern})" for tag, rx in _ENTRY_LAYOUTS)
+_ENTRY_RE = re.compile(_ENTRY_PATTERN)
+# Offset of each layout's first field in m.groups() and its number of fields
+_ENTRY_FIELDS = {tag: (_ENTRY_RE.groupindex[tag], rx.groups) for tag, rx in _ENTRY_LAYOUTS}
+
+# Opt in with EMPOWER_USE_RE2=1 to run the combined scan on RE2 (pip install
+# google-re2), which matches in linear time with no backtracking, so it gets
+# the plain form of the possessive quantifiers. It is off by default: the
+# binding's per-match overhead makes it far slower than the stdlib engine on
+# normal pages. Any pattern RE2 rejects falls back to the stdlib engine.
+if os.environ.get("EMPOWER_USE_RE2"):
+    try:
+        import re2
+        _ENTRY_RE = re2.compile(_ENTRY_PATTERN.replace("++", "+"))
+    except Exception:
+        pass
+
+# BeautifulSoup tree builder: the C-based lxml parser when it is installed,
+# otherwise the pure-Python stdlib parser
+_HTML_PARSER = "lxml" if importlib.util.find_spec("lxml") else "html.parser"
+
+# Read buffer for the MHTML archive; the email parser pulls 8 KiB at a time,
+# so a large buffer keeps that to a handful of read() syscalls
+_READ_BUFFER = 1 << 20
+
+# Extracted page text is cached on disk so re-running on the same archive
+# skips the MIME and HTML parsing, together with the holdings table rows so
+# the table extractor still applies on a hit; bump the version when
+# extraction changes
+_TEXT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "empower-extractor")
+_TEXT_CACHE_VERSION = 1
+
+def extract_mhtml_soup(file_path):
+    """Parse the first HTML part of an MHTML file; returns None if there is none."""
+    # Parse the MHTML file straight from bytes; each part is decoded with
+    # its own charset/transfer encoding only when its content is requested
+    with open(file_path, 'rb', buffering=_READ_BUFFER) as file:
+        message = email.message_from_binary_file(file, policy=policy.default)
+
+    # Iterate through parts to find HTML content; the type check comes
+    # first so image/CSS/script parts are never base64-decoded
+    for part in message.walk():
+        if part.get_content_type() == 'text/html':
+            html_content = part.get_content()
+            if html_content:
+                return bs4.BeautifulSoup(html_content, _HTML_PARSER)
+            break
 
-        # Parse the MHTML content using email parser
-        message = email.message_from_string(mhtml_content, policy=policy.default)
+    return None
 
-        # Extract HTML content from MHTML
-        html_content = None
+def _text_cache_path(file_path):
+    """Cache file for an archive's extracted text, keyed on its content hash."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb', buffering=_READ_BUFFER) as file:
+        for chunk in iter(lambda: file.read(_READ_BUFFER), b''):
+            digest.update(chunk)
+    # The tree builder is part of the key: lxml and html.parser can split text differently
+    return os.path.join(_TEXT_CACHE_DIR, f"v{_TEXT_CACHE_VERSION}-{_HTML_PARSER}-{digest.hexdigest()}.txt")
+
+def _read_text_cache(file_path):
+    """Return (cache path, cached text or None) for an archive."""
+    cache_path = _text_cache_path(file_path)
+    if os.path.exists(cache_path):
+        with open(cache_path, 'r', encoding='utf-8') as file:
+            return cache_path, file.read()
+    return cache_path, None
+
+def _write_text_cache(cache_path, extracted_text):
+    """Store text at cache_path; best effort, a failed write is only logged."""
+    # Write-then-rename so a concurrent run never reads a partial file
+    try:
+        os.makedirs(_TEXT_CACHE_DIR, exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            file.write(extracted_text)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        logger.debug(f"Could not write cache file: {e}")
 
-        # Iterate through parts to find HTML content
-        for part in message.walk():
-            content_type = part.get_content_type()
+def _table_cache_path(cache_path):
+    """Cache file for the holdings table rows stored beside a text cache file."""
+    return f"{os.path.splitext(cache_path)[0]}.table.json"
 
-            if content_type == 'text/html':
-                html_content = part.get_content()
-                break
+def _read_table_cache(cache_path):
+    """Return the cached (entries, grand_totals) of the holdings table, or None."""
+    try:
+        with open(_table_cache_path(cache_path), 'r', encoding='utf-8') as file:
+            table = json.load(file)
+        return [tuple(entry) for entry in table["entries"]], table["grand_totals"]
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+def _write_table_cache(cache_path, entries, grand_totals):
+    """Store the holdings table rows beside the text cache file at cache_path."""
+    _write_text_cache(_table_cache_path(cache_path),
+                      json.dumps({"entries": entries, "grand_totals": grand_totals}))
+
+def extract_mhtml_text(file_path, soup=None, use_cache=True):
+    """
+    Extract text content from an MHTML file, or from an already parsed soup.
+    The on-disk cache is only used when the file itself has to be parsed;
+    a soup passed in is never hashed against or written to it.
+    """
+    try:
+        if soup is not None:
+            return soup.get_text(separator="\n")
 
-        if not html_content:
-            return "Error: No HTML content found in MHTML file."
+        cache_path = None
+        if use_cache:
+            cache_path, cached_text = _read_text_cache(file_path)
+            if cached_text is not None:
+                return cached_text
 
-        # Parse HTML with BeautifulSoup
-        soup = bs4.BeautifulSoup(html_content, "html.parser")
+        soup = extract_mhtml_soup(file_path)
+        if soup is None:
+            return "Error: No HTML content found in MHTML file."
 
         # Extract visible text
         extracted_text = soup.get_text(separator="\n")
-
+        if cache_path:
+            _write_text_cache(cache_path, extracted_text)
         return extracted_text
     except Exception as e:
         logger.error(f"Error reading MHTML file: {e}", exc_info=True)
@@ -113,16 +272,15 @@ def extract_grand_totals(text_content):
     Extract the grand total values (Day_Dollar and Value) from the raw text.
     Returns a tuple of (day_dollar_total, value_total) or None if not found.
     """
-    grand_total_pattern = r'Grand total\s+([+-]?\$[\d,]+\.\d+)\s+\$([\d,]+\.\d+)'
-    match = re.search(grand_total_pattern, text_content)
+    match = _GRAND_TOTAL_RE.search(text_content)
 
     if match:
         day_dollar_total = match.group(1)  # This includes the $ sign
         value_total = match.group(2)       # This doesn't include the $ sign
 
         # Clean the values for numeric comparison
-        day_dollar_numeric = float(day_dollar_total.replace('$', '').replace(',', ''))
-        value_numeric = float(value_total.replace(',', ''))
+        _, day_dollar_numeric = _parse_money(day_dollar_total)
+        _, value_numeric = _parse_money(value_total)
 
         return {
             'day_dollar_total': day_dollar_total,
@@ -146,110 +304,139 @@ def extract_portfolio_holdings(text_content):
     Value
     """
     # Look for the holdings section headers pattern
-    holdings_pattern = r"Holding\s+Shares\s+Price\s+Change\s+1 Day %\s+1 day \$\s+Value"
-    if not re.search(holdings_pattern, text_content):
+    header = _HOLDINGS_HDR_RE.search(text_content)
+    if not header:
         return "Could not find portfolio holdings section in the file."
 
-    # Split the content at the heading line
-    sections = re.split(holdings_pattern, text_content)
-    if len(sections) < 2:
-        return "Could not parse portfolio holdings section."
-
-    # Extract the holdings section (should be after the heading)
-    holdings_section = sections[1]
+    # The holdings section runs from the heading line to "Grand total", or to
+    # the next heading if the page repeats it first; only its offsets are
+    # kept, the text isn't copied. The cheap str.find bounds the second
+    # heading search so the regex never rescans the rest of the page.
+    start = header.end()
+    end = text_content.find("Grand total", start)
+    if end == -1:
+        end = len(text_content)
+    next_header = _HOLDINGS_HDR_RE.search(text_content, start, end)
+    if next_header:
+        end = next_header.start()
 
     # Extract grand total values for integrity check
     grand_totals = extract_grand_totals(text_content)
 
-    # Find where the holdings section ends (typically at "Grand total")
-    end_marker = "Grand total"
-    if end_marker in holdings_section:
-        holdings_section = holdings_section.split(end_marker)[0]
-
-    # Process the holdings data
-    # Look for patterns like ticker symbol followed by company name, shares, etc.
-    holdings_data = []
-
     # Use regex to find holdings entries
     # Look for patterns that include standard stock format, cash, and crypto formats
     entries = []  # Initialize the entries list here
     # Track unique tickers to prevent duplicates
     processed_tickers = set()
 
-    # Standard Entries Pattern : Standard entries for stocks - more flexible pattern
-    standard_entries = re.findall(r'([A-Z0-9\.\-]+)(?:\s+([^\n]+?))\s+(\d+(?:\.\d+)?)\s+\$(\d+(?:\.\d+)?)\s+\$?([-+]?\d+(?:\.\d+)?)\s+([-+]?\d+(?:\.\d+)?%)\s+([-+]?\$\d+(?:,\d+)*(?:\.\d+)?)\s+\$(\d+(?:,\d+)*(?:\.\d+)?)', holdings_section)
+    # Single pass over the section with the combined layout pattern
+    for match in _ENTRY_RE.finditer(text_content, start, end):
+        layout = match.lastgroup
+        offset, count = _ENTRY_FIELDS[layout]
+        entry = match.groups()[offset:offset + count]
+
+        if layout == "cash":
+            shares, price, change, day_percent, day_dollar, value = entry
+            if "CASH" not in processed_tickers:
+                entries.append(("CASH", "Cash", shares, price, change, day_percent, day_dollar, value))
+                processed_tickers.add("CASH")
+            continue
 
-    for entry in standard_entries:
         ticker = entry[0]
         # Only add if this ticker hasn't been processed yet
-        if ticker not in processed_tickers:
-            entries.append(entry)
-            processed_tickers.add(ticker)
-            logger.info(f"Added standard entry: {ticker}")
-
-    # Alternative stock pattern for different spacing or formatting
-    alt_stock_entries = re.findall(r'([A-Z0-9\.\-]+)\s+([^\n]+?)\s+(\d+(?:\.\d+)?)\s+\$(\d+(?:\.\d+)?(?:,\d+)*)\s+([-+]?[^\s]+)\s+([-+]\d+(?:\.\d+)?%)\s+([-+]\$\d+(?:,\d+)*(?:\.\d+)?)\s+\$(\d+(?:,\d+)*(?:\.\d+)?)', holdings_section)
-
-    for entry in alt_stock_entries:
-        ticker = entry[0]
-        if ticker not in processed_tickers:
-            entries.append(entry)
-            processed_tickers.add(ticker)
-            logger.info(f"Added alternative stock entry: {ticker}")
-
-    # Cash entries pattern
-    cash_entries = re.findall(r'Cash\s+(\d+(?:\.\d+)?)\s+\$(\d+(?:\.\d+)?)\s+\$?([-+]?\d+(?:\.\d+)?)\s+([-+]?\d+(?:\.\d+)?%)\s+([-+]?\$\d+(?:,\d+)*(?:\.\d+)?)\s+\$(\d+(?:,\d+)*(?:\.\d+)?)', holdings_section)
+        if ticker in processed_tickers:
+            continue
+        if layout == "crypto":
+            # Clean up the change value to remove any extra $ if present
+            change = entry[4].replace('$', '')
+            entry = (ticker, entry[1], entry[2], entry[3].replace(',', ''), change, entry[5], entry[6], entry[7])
+        entries.append(entry)
+        processed_tickers.add(ticker)
+        logger.info(f"Added {layout} entry: {ticker}")
 
-    for entry in cash_entries:
-        shares, price, change, day_percent, day_dollar, value = entry
-        if "CASH" not in processed_tickers:
-            entries.append(("CASH", "Cash", shares, price, change, day_percent, day_dollar, value))
-            processed_tickers.add("CASH")
+    # Debug info with more details
+    logger.info(f"Total entries found: {len(entries)}")
+    logger.info(f"Unique tickers: {len(processed_tickers)}")
+    logger.info(f"Tickers found: {', '.join(sorted(processed_tickers))}")
 
-    # Generic cryptocurrency pattern - more flexible to catch various crypto formats
-    crypto_entries = re.findall(r'([A-Z0-9]+\.COIN|[A-Z]{3,5})[^\n]*?\s+([A-Z0-9]+|[^\n]+?)\s+(\d+\.\d+)\s+\$([0-9,.]+)\s+([-+]?\$?[0-9,.]+)\s+([-+][0-9.]+%)\s+([-+]\$[0-9,.]+)\s+\$([0-9,.]+)', holdings_section)
+    return _build_holdings(entries, grand_totals)
 
-    for entry in crypto_entries:
-        ticker = entry[0]
-        if ticker not in processed_tickers:
-            # Clean up the change value to remove any extra $ if present
-            change = entry[4].replace('$', '')
-            entries.append((ticker, entry[1], entry[2], entry[3].replace(',', ''), change, entry[5], entry[6], entry[7]))
-            processed_tickers.add(ticker)
-            logger.info(f"Added crypto entry: {ticker}")
+def extract_portfolio_holdings_from_soup(soup):
+    """
+    Extract portfolio holdings from the holdings table in the parsed HTML,
+    reading each row's cells directly instead of regex-matching flat text.
+    Returns None when no table with the holdings header is found, so the
+    caller can fall back to extract_portfolio_holdings on the page text.
+    """
+    if soup is None:
+        return None
+    return _holdings_from_table_rows(*_holdings_table_rows(soup))
+
+def _holdings_from_table_rows(entries, grand_totals):
+    """Holdings built from _holdings_table_rows output, or None if it found no rows."""
+    if not entries:
+        return None
+    logger.info(f"Total entries found in holdings table: {len(entries)}")
+    return _build_holdings(entries, grand_totals)
+
+def _holdings_table_rows(soup):
+    """
+    Raw entry tuples and grand totals of the first holdings table with rows,
+    or ([], None) when there is none.
+    """
+    for table in soup.find_all("table"):
+        rows = table.find_all("tr")
+        if not rows:
+            continue
+        header = tuple(" ".join(cell.get_text(" ", strip=True).split())
+                       for cell in rows[0].find_all(["th", "td"], recursive=False))
+        if header[:len(_HOLDINGS_COLUMNS)] != _HOLDINGS_COLUMNS:
+            continue
 
-    # Add a catch-all pattern for any remaining entries with standard format
-    catchall_entries = re.findall(r'([A-Z0-9\.\-]+)[^\n]*?\n([^\n]+?)\n(\d+(?:\.\d+)?)\n\$(\d+(?:\.\d+)?)\n\$?([-+]?\d+(?:\.\d+)?)\n([-+]?\d+(?:\.\d+)?%)\n([-+]?\$\d+(?:,\d+)*(?:\.\d+)?)\n\$(\d+(?:,\d+)*(?:\.\d+)?)', holdings_section)
+        entries = []
+        grand_totals = None
+        for row in rows[1:]:
+            cells = row.find_all("td", recursive=False)
+            if len(cells) < len(_HOLDINGS_COLUMNS):
+                continue
+
+            # The Holding cell stacks the ticker above the company name
+            holding = cells[0].get_text("\n", strip=True).split("\n")
+            if holding[0] == "Grand total":
+                grand_totals = extract_grand_totals(
+                    " ".join(cell.get_text(" ", strip=True) for cell in cells))
+                break
 
-    for entry in catchall_entries:
-        ticker = entry[0]
-        if ticker not in processed_tickers:
-            entries.append(entry)
-            processed_tickers.add(ticker)
-            logger.info(f"Added catchall entry: {ticker}")
+            shares, price, change, day_percent, day_dollar, value = (
+                cell.get_text(strip=True) for cell in cells[1:len(_HOLDINGS_COLUMNS)])
+            if holding[0] == "Cash":
+                ticker, name = "CASH", "Cash"
+            else:
+                ticker, name = holding[0], " ".join(holding[1:])
+            # Match the text parser's captures: no $ on price, change or value
+            entries.append((ticker, name, shares, price.replace('$', ''), change.replace('$', ''),
+                            day_percent, day_dollar, value.replace('$', '')))
 
-    # MHTML Specific Pattern: Try to find entries that might have different formatting in MHTML files
-    mhtml_entries = re.findall(r'([A-Z0-9\.\-]+)\s+([^\n]+?)\s+(\d+(?:\.\d+)?)\s+\$([\d,.]+)\s+([-+]?\$?[\d,.]+)\s+([-+][\d,.]+%)\s+([-+]\$[\d,.]+)\s+\$([\d,.]+)', holdings_section)
+        if entries:
+            return entries, grand_totals
 
-    for entry in mhtml_entries:
-        ticker = entry[0]
-        if ticker not in processed_tickers:
-            entries.append(entry)
-            processed_tickers.add(ticker)
-            logger.info(f"Added MHTML-specific entry: {ticker}")
+    return [], None
 
-    # Debug info with more details
-    logger.info(f"Total entries found: {len(entries)}")
-    logger.info(f"Unique tickers: {len(processed_tickers)}")
-    logger.info(f"Tickers found: {', '.join(sorted(processed_tickers))}")
+def _build_holdings(entries, grand_totals):
+    """Clean, de-duplicate and sort raw entry tuples, then run the integrity check."""
+    holdings_data = []
+    # Numeric Value / Day $ of each kept holding, collected as rows are built
+    value_numbers = []
+    day_dollar_numbers = []
+    # (Shares, cleaned Value) -> ticker of the first holding kept with that pair
+    seen_shares_value = {}
 
     # Process all found entries
     for entry in entries:
         ticker, name, shares, price, change, day_percent, day_dollar, value = entry
 
         # If name is empty or None (which can happen for crypto), use ticker as name
-        if not name or name.strip() == "":
-            name = ticker
+        name = (name.strip() if name else "") or ticker
 
         # Check for potential false positives where part of the name was captured as a ticker
         # Common patterns: "ETF Shares" being split into "ETF" as ticker and "Shares" as name
@@ -257,35 +444,25 @@ def extract_portfolio_holdings(text_content):
             # Skip this entry as it's likely part of another entry
             continue
 
+        # Clean the value field by removing $ and commas
+        value_clean, value_num = _parse_money(value)
+
         # Detect duplicate entries by comparing values
         # If we already have an entry with same share count and value, skip this one
-        duplicate = False
-        for existing_holding in holdings_data:
-            if (existing_holding["Shares"] == shares and
-                existing_holding["Value"] == value.replace('$', '').replace(',', '') and
-                ticker != existing_holding["Ticker"]):
-                logger.info(f"Skipping duplicate entry for {ticker} (likely part of {existing_holding['Ticker']})")
-                duplicate = True
-                break
-
-        if duplicate:
+        owner = seen_shares_value.setdefault((shares, value_clean), ticker)
+        if owner != ticker:
+            logger.info(f"Skipping duplicate entry for {ticker} (likely part of {owner})")
             continue
 
         # Strip currency symbol from day_dollar but keep track of negative/positive
-        day_dollar_clean = day_dollar.replace('$', '').replace(',', '')
-        is_negative = '-' in day_dollar_clean
-        day_dollar_clean = day_dollar_clean.replace('-', '')
-        if is_negative and not day_dollar_clean.startswith('-'):
-            day_dollar_clean = '-' + day_dollar_clean
+        day_dollar_clean, day_dollar_num = _parse_money(day_dollar, sign_first=True)
 
-        # Clean the value field by removing $ and commas
-        value_clean = value.replace('$', '').replace(',', '')
         # Clean price field by removing commas
         price_clean = price.replace(',', '')
 
         holdings_data.append({
             "Ticker": ticker,
-            "Name": name.strip(),
+            "Name": name,
             "Shares": shares,
             "Price": price_clean,  # Use cleaned price value
             "Change": change,
@@ -293,17 +470,25 @@ def extract_portfolio_holdings(text_content):
             "Day_Dollar": day_dollar_clean,  # Cleaned for CSV
             "Day_Dollar_Original": day_dollar,  # Keep original for text formatting
             "Value": value_clean,  # Cleaned for CSV
-            "Value_Original": value  # Keep original for text formatting
+            "Value_Original": value,  # Keep original for text formatting
+            "Value_num": value_num  # Parsed once for sorting and totals
         })
+        value_numbers.append(value_num)
+        day_dollar_numbers.append(day_dollar_num)
+
+    # The Value column drives both the sort and the totals
+    values = np.fromiter(value_numbers, dtype=np.float64, count=len(value_numbers))
 
-    # Sort holdings by value in descending order
-    holdings_data = sorted(holdings_data, key=lambda x: float(x['Value']), reverse=True)
+    # Sort holdings by value in descending order (stable, like sorted(reverse=True))
+    order = np.argsort(-values, kind='stable')
+    holdings_data = [holdings_data[i] for i in order]
 
     # Perform integrity check if grand totals were found
     if grand_totals:
         # Calculate totals from processed data
-        calculated_day_dollar = sum(float(holding['Day_Dollar']) for holding in holdings_data)
-        calculated_value = sum(float(holding['Value']) for holding in holdings_data)
+        calculated_day_dollar = float(np.fromiter(day_dollar_numbers, dtype=np.float64,
+                                                  count=len(day_dollar_numbers)).sum())
+        calculated_value = float(values.sum())
 
         # Format calculated values for display
         formatted_day_dollar = "${:,.2f}".format(calculated_day_dollar)
@@ -338,6 +523,12 @@ def extract_portfolio_holdings(text_content):
     # If no grand totals found, just return the holdings data
     return holdings_data
 
+def _value_number(holding):
+    """Numeric Value of a holding, using the parsed Value_num when present."""
+    if "Value_num" in holding:
+        return holding["Value_num"]
+    return _parse_money(holding.get("Value") or "")[1]
+
 def save_holdings_to_csv(holdings_data, output_file):
     """Save the holdings data to a CSV file"""
     # Check if we have the new format with grand_totals
@@ -347,24 +538,37 @@ def save_holdings_to_csv(holdings_data, output_file):
         actual_holdings = holdings_data
 
     # Sort holdings by Value in descending order
-    sorted_holdings = sorted(actual_holdings, key=lambda x: float(x.get('Value', 0) or 0), reverse=True)
+    sorted_holdings = sorted(actual_holdings, key=_value_number, reverse=True)
 
-    # Define CSV headers with Name before Ticker
-    fieldnames = ["Name", "Ticker", "Shares", "Price", "Change", "Day_Percent", "Day_Dollar", "Value"]
+    fieldnames = _CSV_FIELDS
 
     try:
         with open(output_file, 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            writer.writeheader()
-            # Write rows but exclude the _Original fields not meant for CSV
-            for row in sorted_holdings:
-                csv_row = {k: v for k, v in row.items() if not k.endswith('_Original')}
-                writer.writerow(csv_row)
+            writer = csv.writer(csvfile)
+            writer.writerow(fieldnames)
+            # Pull just the CSV columns (not the _Original fields) from each row
+            writer.writerows(map(operator.itemgetter(*fieldnames), sorted_holdings))
         return True
     except Exception as e:
         logger.error(f"Error saving CSV file: {e}")
         return False
 
+def holdings_to_dataframe(holdings_data):
+    """
+    Return the holdings as a column-oriented pandas DataFrame (CSV column order)
+    with Shares, Price, Day_Dollar and Value as float64 columns, for callers
+    that total, sort or filter the portfolio without per-row dict access.
+    """
+    import pandas as pd
+
+    if isinstance(holdings_data, dict) and 'holdings' in holdings_data:
+        holdings_data = holdings_data['holdings']
+
+    df = pd.DataFrame.from_records(holdings_data, columns=list(_CSV_FIELDS))
+    for column in ("Shares", "Price", "Day_Dollar", "Value"):
+        df[column] = pd.to_numeric(df[column], errors='coerce')
+    return df
+
 def format_holdings_as_text(holdings_data):
     """Format holdings data as formatted text"""
     # Check if we have the new format with grand_totals
@@ -394,9 +598,13 @@ def format_holdings_as_text(holdings_data):
 
     return "\n\n".join(formatted_text)
 
+def find_mhtml_files():
+    """Return all .mhtml and .mht files in the current directory"""
+    return glob.glob("*.mhtml") + glob.glob("*.mht")
+
 def list_mhtml_files():
     """Find and list all .mhtml and .mht files in the current directory"""
-    mhtml_files = glob.glob("*.mhtml") + glob.glob("*.mht")
+    mhtml_files = find_mhtml_files()
     if not mhtml_files:
         logger.error("No .mhtml or .mht files found in the current directory.")
         sys.exit(1)
@@ -420,74 +628,65 @@ def list_mhtml_files():
         except ValueError:
             print("Please enter a valid number")
 
-def display_csv_as_table(csv_file, holdings_data=None):
-    """Read CSV file and display its contents as a formatted table"""
+def display_holdings_as_table(holdings_data):
+    """Display the holdings (in CSV column order) as a formatted table"""
     try:
-        with open(csv_file, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            rows = list(reader)
-
-            if not rows:
-                print("No data found in CSV file.")
-                return
-
-            # Get headers from the first row
-            headers = list(rows[0].keys())
-
-            # Calculate column widths (minimum width is the header length)
-            col_widths = {header: len(header) for header in headers}
-            for row in rows:
-                for header in headers:
-                    col_widths[header] = max(col_widths[header], len(row[header]))
-
-            # Set Name column width to 40 characters
-            if "Name" in col_widths:
-                col_widths["Name"] = 40
-
-            # Print header row
-            header_row = " | ".join(header.ljust(col_widths[header]) for header in headers)
-            print(header_row)
-            print("-" * len(header_row))
-
-            # Print data rows
-            for row in rows:
-                data_row = " | ".join(row[header].ljust(col_widths[header]) for header in headers)
-                print(data_row)
-
-            # Calculate total portfolio value
-            total_value = 0.0
-            total_day_dollar = 0.0
-            for row in rows:
-                if "Value" in row and row["Value"]:
-                    try:
-                        total_value += float(row["Value"].replace(',', ''))
-                    except ValueError:
-                        # Skip non-numeric values
-                        pass
-                if "Day_Dollar" in row and row["Day_Dollar"]:
-                    try:
-                        total_day_dollar += float(row["Day_Dollar"].replace(',', ''))
-                    except ValueError:
-                        # Skip non-numeric values
-                        pass
-
-            # Format total values as currency with commas
-            formatted_total_value = "${:,.2f}".format(total_value)
-            formatted_total_day_dollar = "${:,.2f}".format(total_day_dollar)
-
-            print(f"\nTotal: {len(rows)} holdings")
-            print(f"Total Day $ Change: {formatted_total_day_dollar}")
-            print(f"Total Portfolio Value: {formatted_total_value}")
-
-            # Display integrity check results if available
-            if holdings_data and isinstance(holdings_data, dict) and 'grand_totals' in holdings_data:
-                gt = holdings_data['grand_totals']
-                print("\nIntegrity Check:")
-                print(f"Raw Grand Total (Day $): {gt['raw_day_dollar']} | Calculated: {gt['calculated_day_dollar']} | {'✓ Match' if gt['day_dollar_match'] else '✗ Mismatch'}")
-                print(f"Raw Grand Total (Value): {gt['raw_value']} | Calculated: {gt['calculated_value']} | {'✓ Match' if gt['value_match'] else '✗ Mismatch'}")
+        if isinstance(holdings_data, dict) and 'holdings' in holdings_data:
+            rows = holdings_data['holdings']
+        else:
+            rows = holdings_data
+
+        if not rows:
+            print("No holdings to display.")
+            return
+
+        headers = _CSV_FIELDS
+
+        # Pull each row's cells out once, widening the columns as we go
+        # (minimum width is the header length)
+        col_widths = [len(header) for header in headers]
+        table = []
+        for row in rows:
+            cells = [row[header] for header in headers]
+            for i, cell in enumerate(cells):
+                if len(cell) > col_widths[i]:
+                    col_widths[i] = len(cell)
+            table.append(cells)
+
+        # Set Name column width to 40 characters
+        if "Name" in headers:
+            col_widths[headers.index("Name")] = 40
+
+        # Print header row
+        header_row = " | ".join(header.ljust(width) for header, width in zip(headers, col_widths))
+        print(header_row)
+        print("-" * len(header_row))
+
+        # Print data rows
+        for cells in table:
+            print(" | ".join(cell.ljust(width) for cell, width in zip(cells, col_widths)))
+
+        # Calculate total portfolio value (non-numeric values count as zero)
+        total_value = sum(map(_value_number, rows))
+        total_day_dollar = sum(_parse_money(row.get("Day_Dollar") or "")[1] for row in rows)
+
+        # Format total values as currency with commas
+        formatted_total_value = "${:,.2f}".format(total_value)
+        formatted_total_day_dollar = "${:,.2f}".format(total_day_dollar)
+
+        print(f"\nTotal: {len(rows)} holdings")
+        print(f"Total Day $ Change: {formatted_total_day_dollar}")
+        print(f"Total Portfolio Value: {formatted_total_value}")
+
+        # Display integrity check results if available
+        if holdings_data and isinstance(holdings_data, dict) and 'grand_totals' in holdings_data:
+            gt = holdings_data['grand_totals']
+            print("\nIntegrity Check:")
+            print(f"Raw Grand Total (Day $): {gt['raw_day_dollar']} | Calculated: {gt['calculated_day_dollar']} | {'✓ Match' if gt['day_dollar_match'] else '✗ Mismatch'}")
+            print(f"Raw Grand Total (Value): {gt['raw_value']} | Calculated: {gt['calculated_value']} | {'✓ Match' if gt['value_match'] else '✗ Mismatch'}")
 
     except Exception as e:
-        print(f"Error displaying CSV data: {e}")
+        print(f"Error displaying holdings: {e}")
 
 def extract_net_worth_data(text_content):
     """Extract net worth data from the text content"""
@@ -513,7 +712,7 @@ def extract_net_worth_data(text_content):
         if line.startswith('$') and ',' in line and len(line) > 8:
             # Check if this might be the grand total (large amount)
             try:
-                amount_str = line.replace('$', '').replace(',', '')
+                amount_str = line.translate(_STRIP)
                 amount = float(amount_str)
                 if amount > 1000000:  # Assume grand total is over 1M
                     grand_total = amount_str
@@ -560,7 +759,7 @@ def extract_net_worth_data(text_content):
                 # Check if this is a balance (starts with $ and has numbers)
                 if next_line.startswith('$') and any(c.isdigit() for c in next_line):
                     try:
-                        balance_str = next_line.replace('$', '').replace(',', '')
+                        balance_str = next_line.translate(_STRIP)
                         balance_float = float(balance_str)
 
                         # Extract account name (remove "Ending in" part)
@@ -668,12 +867,12 @@ def extract_net_worth_data(text_content):
                     try:
                         # Handle negative balances properly
                         is_negative = next_line.startswith('-$')
-                        balance_str = next_line.replace('$', '').replace(',', '')
+                        balance_str = next_line.translate(_STRIP)
                         if is_negative:
                             balance_str = next_line.replace('-$', '').replace(',', '')
                             balance_str = f"-{balance_str}"  # Keep the negative sign
                         else:
-                            balance_str = next_line.replace('$', '').replace(',', '')
+                            balance_str = next_line.translate(_STRIP)
 
                         balance_float = float(balance_str)
 
@@ -720,7 +919,7 @@ def extract_net_worth_data(text_content):
                 next_line = lines[j].strip()
                 if next_line.startswith('$') and any(c.isdigit() for c in next_line):
                     try:
-                        balance_str = next_line.replace('$', '').replace(',', '')
+                        balance_str = next_line.translate(_STRIP)
                         balance_float = float(balance_str)
 
                         accounts.append({
@@ -831,48 +1030,51 @@ def format_networth_as_text(networth_data):
 
     return "\n".join(lines)
 
-def main():
-    # Set up argument parser
-    parser = argparse.ArgumentParser(description="Extract data from MHTML files")
-    parser.add_argument("input_file", nargs='?', help="Path to the .mhtml/.mht file")
-    parser.add_argument("-o", "--output", help="Output file base name (without extension)")
-    parser.add_argument("--portfolio", action="store_true", help="Extract portfolio holdings information only")
-    parser.add_argument("--csv", action="store_true", help="Save portfolio holdings as CSV file")
-    parser.add_argument("--full-text", action="store_true", help="Extract full text content (default is portfolio+csv)")
-    parser.add_argument("--debug", action="store_true", help="Enable debug logging")
-    args = parser.parse_args()
-
-    # Set debug level if requested
-    if args.debug:
-        logger.setLevel(logging.DEBUG)
-
-    # Set defaults if no specific options provided
-    if not (args.portfolio or args.csv or args.full_text):
-        # Default behavior: extract portfolio and save as CSV
-        args.portfolio = True
-        args.csv = True
-
-    # If no input file provided, list available MHTML files
-    if not args.input_file:
-        args.input_file = list_mhtml_files()
-
-    # Validate input file
-    if not os.path.exists(args.input_file):
-        logger.error(f"Error: File '{args.input_file}' not found.")
-        sys.exit(1)
-
-    # Determine output filename
-    if args.output:
-        output_file_base = os.path.splitext(args.output)[0]
-    else:
-        output_file_base = os.path.splitext(args.input_file)[0]
+def process_one_file(input_file, args, output_file_base=None, show_table=True):
+    """
+    Run the extraction selected by the CLI options in args for one MHTML file
+    and write its outputs next to output_file_base (default: the input path
+    without extension). Returns a dict with the file, a status of "ok",
+    "no_holdings" or "extract_error", and the written outputs or the error.
+    """
+    if output_file_base is None:
+        output_file_base = os.path.splitext(input_file)[0]
 
     output_txt = f"{output_file_base}.txt"
     output_csv = f"{output_file_base}.csv"
+    outputs = []
 
     # Extract text content
-    logger.info(f"Extracting text from '{args.input_file}'...")
-    extracted_text = extract_mhtml_text(args.input_file)
+    logger.info(f"Extracting text from '{input_file}'...")
+    # Check the cache first; the HTML is only parsed on a miss. The table
+    # extractor's rows are cached with the text, so a hit gives the same
+    # holdings as a cold run.
+    use_table = (args.portfolio or args.csv) and not args.text_parser
+    soup = None
+    extracted_text = None
+    table_rows = None
+    cache_path = None
+    if not args.no_cache:
+        try:
+            cache_path, extracted_text = _read_text_cache(input_file)
+        except OSError:
+            pass  # extract_mhtml_text below logs and reports the error
+        if extracted_text is not None and use_table:
+            table_rows = _read_table_cache(cache_path)
+    if extracted_text is None or (use_table and table_rows is None):
+        if use_table:
+            try:
+                soup = extract_mhtml_soup(input_file)
+            except Exception:
+                pass  # extract_mhtml_text below logs and reports the error
+            if soup is not None:
+                table_rows = _holdings_table_rows(soup)
+                if cache_path:
+                    _write_table_cache(cache_path, *table_rows)
+        if extracted_text is None:
+            extracted_text = extract_mhtml_text(input_file, soup=soup, use_cache=False)
+            if cache_path and not extracted_text.startswith("Error"):
+                _write_text_cache(cache_path, extracted_text)
 
     # Save raw text for debugging if debug mode enabled
     if args.debug:
@@ -884,18 +1086,24 @@ def main():
     if extracted_text and not extracted_text.startswith("Error"):
         # Process for portfolio holdings if requested
         if args.portfolio or args.csv:
-            holdings_data = extract_portfolio_holdings(extracted_text)
+            holdings_data = None
+            if table_rows is not None:
+                holdings_data = _holdings_from_table_rows(*table_rows)
+            if holdings_data is None:
+                holdings_data = extract_portfolio_holdings(extracted_text)
             if isinstance(holdings_data, str) and holdings_data.startswith("Could not"):
                 logger.error(holdings_data)
-                sys.exit(1)
+                return {"file": input_file, "status": "no_holdings", "error": holdings_data}
 
             # Save as CSV if requested
             if args.csv:
                 if save_holdings_to_csv(holdings_data, output_csv):
                     logger.info(f"Portfolio holdings saved as CSV to '{output_csv}'")
+                    outputs.append(output_csv)
                     # Display the CSV contents as a table
-                    print("\nPortfolio Holdings Table:")
-                    display_csv_as_table(output_csv, holdings_data)
+                    if show_table:
+                        print("\nPortfolio Holdings Table:")
+                        display_holdings_as_table(holdings_data)
 
             # Format holdings as text for text output
             if args.portfolio:
@@ -903,15 +1111,104 @@ def main():
                 with open(output_txt, "w", encoding="utf-8") as file:
                     file.write(formatted_text)
                 logger.info(f"Portfolio holdings text saved to '{output_txt}'")
-                return
+                outputs.append(output_txt)
+                return {"file": input_file, "status": "ok", "outputs": outputs}
 
         # Save extracted text to file (unless we're only creating CSV)
         if args.full_text or args.portfolio:
             with open(output_txt, "w", encoding="utf-8") as file:
                 file.write(extracted_text)
             logger.info(f"Extraction complete. Text saved to '{output_txt}'")
+            outputs.append(output_txt)
+        return {"file": input_file, "status": "ok", "outputs": outputs}
+
+    error = extracted_text or "Extraction failed: No content extracted"
+    logger.error(error)
+    return {"file": input_file, "status": "extract_error", "error": error}
+
+def process_all_files(args):
+    """
+    Process every MHTML file in the current directory in parallel, one worker
+    process per core (parsing is CPU-bound and holds the GIL). Per-file tables
+    are not printed; a one-line summary per file is logged instead.
+    Returns True if every file succeeded.
+    """
+    mhtml_files = find_mhtml_files()
+    if not mhtml_files:
+        logger.error("No .mhtml or .mht files found in the current directory.")
+        return False
+
+    all_ok = True
+    max_workers = min(len(mhtml_files), os.cpu_count() or 1)
+    # Workers re-apply the parent's log level (spawned processes start fresh)
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=logger.setLevel,
+                             initargs=(logger.level,)) as executor:
+        futures = {executor.submit(process_one_file, path, args, None, False): path
+                   for path in mhtml_files}
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {"file": path, "status": "failed", "error": str(e)}
+            if result["status"] == "ok":
+                logger.info(f"✓ {path}: {', '.join(result['outputs']) or 'no output'}")
+            else:
+                all_ok = False
+                logger.error(f"✗ {path}: {result['error']}")
+
+    return all_ok
+
+def main():
+    # Set up argument parser
+    parser = argparse.ArgumentParser(description="Extract data from MHTML files")
+    parser.add_argument("input_file", nargs='?', help="Path to the .mhtml/.mht file")
+    parser.add_argument("-o", "--output", help="Output file base name (without extension)")
+    parser.add_argument("--portfolio", action="store_true", help="Extract portfolio holdings information only")
+    parser.add_argument("--csv", action="store_true", help="Save portfolio holdings as CSV file")
+    parser.add_argument("--full-text", action="store_true", help="Extract full text content (default is portfolio+csv)")
+    parser.add_argument("--text-parser", action="store_true",
+                        help="Parse holdings from the flattened page text instead of the HTML table")
+    parser.add_argument("--no-cache", action="store_true", help="Don't read or write the extracted-text cache")
+    parser.add_argument("--all", action="store_true",
+                        help="Process every .mhtml/.mht file in the current directory in parallel")
+    parser.add_argument("--debug", action="store_true", help="Enable debug logging")
+    args = parser.parse_args()
+
+    if args.all and (args.input_file or args.output):
+        parser.error("--all processes every file in the current directory; omit input_file and -o")
+
+    # Set debug level if requested
+    if args.debug:
+        logger.setLevel(logging.DEBUG)
+
+    # Set defaults if no specific options provided
+    if not (args.portfolio or args.csv or args.full_text):
+        # Default behavior: extract portfolio and save as CSV
+        args.portfolio = True
+        args.csv = True
+
+    if args.all:
+        sys.exit(0 if process_all_files(args) else 1)
+
+    # If no input file provided, list available MHTML files
+    if not args.input_file:
+        args.input_file = list_mhtml_files()
+
+    # Validate input file
+    if not os.path.exists(args.input_file):
+        logger.error(f"Error: File '{args.input_file}' not found.")
+        sys.exit(1)
+
+    # Determine output filename
+    if args.output:
+        output_file_base = os.path.splitext(args.output)[0]
     else:
-        logger.error(extracted_text or "Extraction failed: No content extracted")
+        output_file_base = os.path.splitext(args.input_file)[0]
+
+    result = process_one_file(args.input_file, args, output_file_base)
+    if result["status"] == "no_holdings":
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
@@ -5,26 +5,33 @@ Improved MHTML parser that uses the advanced webarchive parser logic
 
 import email
 from email import policy
+import importlib.util
 import bs4
 import logging
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
+# Prefer the C-based lxml tree builder; fall back to the stdlib parser
+_HTML_PARSER = "lxml" if importlib.util.find_spec("lxml") else "html.parser"
+
+# Read buffer for the MHTML archive; the email parser pulls 8 KiB at a time,
+# so a large buffer keeps that to a handful of read() syscalls
+_READ_BUFFER = 1 << 20
+
 def extract_mhtml_text(file_path):
     """Extract text content from an MHTML file."""
     try:
-        # Read the MHTML file
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as file:
-            mhtml_content = file.read()
-
-        # Parse the MHTML content using email parser
-        message = email.message_from_string(mhtml_content, policy=policy.default)
+        # Parse the MHTML file straight from bytes; each part is decoded with
+        # its own charset/transfer encoding only when its content is requested
+        with open(file_path, 'rb', buffering=_READ_BUFFER) as file:
+            message = email.message_from_binary_file(file, policy=policy.default)
 
         # Extract HTML content from MHTML
         html_content = None
 
-        # Iterate through parts to find HTML content
+        # Iterate through parts to find HTML content; the type check comes
+        # first so image/CSS/script parts are never base64-decoded
         for part in message.walk():
             content_type = part.get_content_type()
 
@@ -36,7 +43,7 @@ def extract_mhtml_text(file_path):
             return "Error: No HTML content found in MHTML file."
 
         # Parse HTML with BeautifulSoup
-        soup = bs4.BeautifulSoup(html_content, "html.parser")
+        soup = bs4.BeautifulSoup(html_content, _HTML_PARSER)
 
         # Extract visible text
         extracted_text = soup.get_text(separator="\n")